@@ -4,24 +4,30 @@ from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.types import BotCommand
-from telethon import TelegramClient, events
+from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError
 from config import (
     BOT_TOKEN, API_ID, API_HASH,
     GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE,
-    ADMINS_FILE, STATS_FILE, BOT_COMMANDS
+    ADMINS_FILE, STATS_FILE, BOT_COMMANDS,
+    ENTITY_CACHE_FILE, NEGATIVE_CACHE_FILE
 )
+from handlers.admin_middleware import AdminMiddleware
 from handlers import (
     base_handler, group_handler,
     contacts_handler, blacklist_handler,
-    stats_handler, message_handler
-)
-from utils.json_utils import (
-    init_json_files, load_json, save_json,
-    update_stats
+    stats_handler, message_handler, callback_handler
 )
+from utils.json_utils import store, update_stats
 from utils.logger import logger
-from utils.telegram_utils import add_contact_to_telegram, get_group_info, is_admin_in_group, get_user_info
+from utils.entity_cache import entity_cache
+from utils.contact_scheduler import ContactAddScheduler
+from utils.notifier import AdminNotifier
+from utils.ingest import IngestPipeline
+from utils.telegram_utils import (
+    get_group_info, is_admin_in_group,
+    get_user_info, GroupMessageFilter
+)
 from datetime import datetime
 
 # Инициализация JSON файлов с дефолтными значениями
@@ -30,6 +36,7 @@ DEFAULT_FILES = {
     CONTACTS_FILE: {},
     BLACKLIST_FILE: {},
     ADMINS_FILE: {},
+    NEGATIVE_CACHE_FILE: {},
     STATS_FILE: {
         'total_contacts': 0,
         'total_groups': 0,
@@ -37,27 +44,6 @@ DEFAULT_FILES = {
     }
 }
 
-async def notify_admin(bot: Bot, group_id: int, user_data: dict):
-    """Отправляет уведомление админу группы о новом контакте"""
-    try:
-        admins = load_json(ADMINS_FILE)
-        group_admins = admins.get(str(group_id), {})
-        
-        for admin_id in group_admins:
-            try:
-                message = (
-                    f"✅ <b>Новый контакт добавлен из группы {user_data.get('group_title', 'Неизвестная группа')}:</b>\n\n"
-                    f"👤 {user_data['first_name']} {user_data.get('last_name', '')}\n"
-                    f"🔗 @{user_data.get('username', 'Нет username')}\n"
-                    f"📱 {user_data.get('phone', 'Нет телефона')}\n"
-                    f"🆔 {user_data['id']}"
-                )
-                await bot.send_message(int(admin_id), message)
-            except Exception as e:
-                logger.error(f"Ошибка при отправке уведомления админу {admin_id}: {e}")
-    except Exception as e:
-        logger.error(f"Ошибка при отправке уведомлений админам: {e}")
-
 async def start_client():
     """Запускает клиент Telethon и выполняет аутентификацию"""
     client = TelegramClient(
@@ -106,8 +92,13 @@ async def main():
         logging.getLogger('telethon').setLevel(logging.WARNING)
         logging.getLogger('aiohttp').setLevel(logging.WARNING)
         
-        # Инициализируем JSON файлы
-        init_json_files(DEFAULT_FILES)
+        # Загружаем данные в память и запускаем фоновый сброс на диск
+        store.open(DEFAULT_FILES)
+        store.start()
+        
+        # Восстанавливаем кэш сущностей с прошлого запуска
+        entity_cache.load(ENTITY_CACHE_FILE)
+        entity_cache.start(ENTITY_CACHE_FILE)
         
         # Запускаем клиент Telethon
         client = await start_client()
@@ -136,6 +127,11 @@ async def main():
         # Инициализируем диспетчер
         dp = Dispatcher()
         
+        # Проверка прав для хэндлеров с флагом admin во всех роутерах
+        dp.message.middleware(AdminMiddleware())
+        dp.callback_query.middleware(AdminMiddleware())
+        dp.inline_query.middleware(AdminMiddleware())
+        
         # Регистрируем все хэндлеры
         dp.include_router(base_handler.router)
         dp.include_router(group_handler.router)
@@ -143,58 +139,68 @@ async def main():
         dp.include_router(blacklist_handler.router)
         dp.include_router(stats_handler.router)
         dp.include_router(message_handler.router)
+        dp.include_router(callback_handler.router)
         
-        # Добавляем обработчик новых сообщений в Telethon
-        @client.on(events.NewMessage)
+        # Уведомления админам отправляются через очередь с ограничением темпа
+        notifier = AdminNotifier(bot)
+        notifier.start()
+        bot.notifier = notifier
+        
+        async def on_contact_added(user_data: dict, contact_data: dict):
+            """Действия после успешного добавления контакта планировщиком"""
+            # Уведомляем админа только для новых контактов
+            notifier.notify_contact(user_data['group_id'], user_data)
+            logger.info(f"Добавлен новый контакт: {user_data['first_name']} из группы {user_data['group_title']}")
+            # Обновляем статистику после добавления контакта
+            update_stats(STATS_FILE, GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE)
+        
+        # Добавление контактов идет через очередь, чтобы медленные запросы
+        # и FloodWait не задерживали обработку сообщений
+        contact_scheduler = ContactAddScheduler(client, on_contact_added)
+        contact_scheduler.start()
+        bot.contact_scheduler = contact_scheduler
+        
+        # Сообщения из групп от Telethon и aiogram проходят один общий путь
+        ingest = IngestPipeline(contact_scheduler)
+        bot.ingest = ingest
+        
+        # Обработчик новых сообщений в Telethon
         async def handle_new_message(event):
             try:
                 if not event.is_group:
                     return
                     
-                # Получаем информацию о группе и отправителе
-                group = await event.get_chat()
-                sender = await event.get_sender()
-                
-                # Проверяем, отслеживается ли группа
-                groups = load_json(GROUPS_FILE)
-                if str(group.id) not in groups:
-                    return
-                    
-                # Получаем данные пользователя
-                user_data = {
-                    'id': sender.id,
-                    'username': sender.username,
-                    'first_name': sender.first_name,
-                    'last_name': getattr(sender, 'last_name', ''),
-                    'phone': getattr(sender, 'phone', ''),
-                    'group_id': str(group.id),
-                    'group_title': group.title
-                }
-                
-                # Пробуем добавить контакт
-                try:
-                    # Сначала проверяем, есть ли пользователь уже в базе
-                    contacts = load_json(CONTACTS_FILE)
-                    user_id_str = str(user_data['id'])
+                async def resolve_sender():
+                    # Получаем информацию о группе и отправителе
+                    group = await event.get_chat()
+                    sender = await event.get_sender()
+                    if sender is None:
+                        return None
+                        
+                    # Сущности из события кладем в кэш, чтобы не запрашивать их повторно
+                    entity_cache.put(group)
+                    entity_cache.put(sender)
                     
-                    if user_id_str in contacts:
-                        logger.info(f"Контакт {user_data['first_name']} уже есть в базе")
-                        return
+                    return {
+                        'id': sender.id,
+                        'username': sender.username,
+                        'first_name': sender.first_name,
+                        'last_name': getattr(sender, 'last_name', ''),
+                        'phone': getattr(sender, 'phone', ''),
+                        'group_id': str(group.id),
+                        'group_title': group.title
+                    }
                     
-                    # Если контакта нет в базе, пробуем добавить
-                    contact_result = await add_contact_to_telegram(client, user_data)
-                    if contact_result:
-                        # Уведомляем админа только для новых контактов
-                        await notify_admin(bot, group.id, user_data)
-                        logger.info(f"Добавлен новый контакт: {user_data['first_name']} из группы {group.title}")
-                        # Обновляем статистику после добавления контакта
-                        update_stats(STATS_FILE, GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE)
-                except Exception as e:
-                    logger.error(f"Ошибка при добавлении контакта: {e}")
+                await ingest.process(event.chat_id, event.id, event.sender_id, resolve_sender)
             
             except Exception as e:
                 logger.error(f"Ошибка при обработке нового сообщения: {e}")
         
+        # Подписываем обработчик только на отслеживаемые группы,
+        # хэндлеры пересобирают фильтр при добавлении и удалении групп
+        bot.group_filter = GroupMessageFilter(client, handle_new_message)
+        bot.group_filter.refresh()
+        
         # Запускаем бота
         await dp.start_polling(bot)
         
@@ -202,9 +208,20 @@ async def main():
         logger.error(f"Ошибка при запуске бота: {e}")
         raise
     finally:
+        # Останавливаем очередь добавления контактов
+        if 'contact_scheduler' in locals():
+            await contact_scheduler.stop()
+        # Отправляем накопленные уведомления
+        if 'notifier' in locals():
+            await notifier.stop()
         # Закрываем клиент Telethon при выходе
         if 'client' in locals():
             await client.disconnect()
+        # Записываем на диск оставшиеся изменения
+        await store.close()
+        logger.info(f"Кэш сущностей: {entity_cache.stats()}")
+        await entity_cache.stop()
+        entity_cache.save(ENTITY_CACHE_FILE)
             
 if __name__ == "__main__":
     asyncio.run(main())
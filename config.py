@@ -9,9 +9,14 @@ BOT_COMMANDS = [
     ('add_group', 'Добавить группу для отслеживания'),
     ('groups', 'Показать список отслеживаемых групп'),
     ('contacts', 'Показать список контактов'),
+    ('find', 'Найти контакт'),
+    ('export', 'Выгрузить контакты в файл'),
     ('blacklist', 'Добавить пользователя в черный список'),
     ('blacklist_list', 'Показать черный список'),
     ('stats', 'Показать статистику'),
+    ('stats_rebuild', 'Пересчитать статистику заново'),
+    ('failed', 'Показать пользователей, которых не удалось добавить'),
+    ('failed_clear', 'Очистить список неудачных добавлений'),
     ('help', 'FAQ и справка по использованию')
 ]
 
@@ -21,4 +26,64 @@ CONTACTS_FILE = f'{DATA_DIR}/contacts.json'
 BLACKLIST_FILE = f'{DATA_DIR}/blacklist.json'
 GROUPS_FILE = f'{DATA_DIR}/groups.json'
 STATS_FILE = f'{DATA_DIR}/stats.json'
-ADMINS_FILE = f'{DATA_DIR}/admins.json' 
\ No newline at end of file
+ADMINS_FILE = f'{DATA_DIR}/admins.json'
+NEGATIVE_CACHE_FILE = f'{DATA_DIR}/failed_contacts.json'
+
+# Хранилище данных
+FLUSH_INTERVAL = 5  # Интервал сброса изменений на диск (в секундах)
+GROUP_COMMIT_WINDOW = 0.01  # Окно объединения записей в один fsync (в секундах)
+STORAGE_BACKEND = 'json'  # 'json' - файлы data/*.json, 'sqlite' - локальная база SQLite
+SQLITE_FILE = f'{DATA_DIR}/bot.db'
+JOURNAL_ENABLED = True  # Журнал изменений для JSON файлов вместо их полной перезаписи
+JOURNAL_FILE = f'{DATA_DIR}/journal.jsonl'
+JOURNAL_COMPACT_THRESHOLD = 10000  # Количество записей журнала до сжатия в снимки
+# Коллекции, разбитые на шарды: путь -> количество шардов (меняется через python -m utils.shards)
+SHARDED_FILES = {
+    CONTACTS_FILE: 16
+}
+# Формат файлов данных: json-pretty, json (orjson, если установлен) или msgpack,
+# со сжатием через "+gzip" или "+zstd", например "msgpack+zstd" (нужны пакеты msgpack и zstandard).
+# Формат при чтении определяется по содержимому, перевод файлов: python -m utils.serializers
+DATA_FORMAT = 'json-pretty'
+# Формат отдельных коллекций
+DATA_FORMATS = {
+    CONTACTS_FILE: 'json'
+}
+
+# Кэш сущностей Telegram
+ENTITY_CACHE_SIZE = 10000  # Максимальное количество записей
+ENTITY_CACHE_TTL = 3600  # Время жизни записи (в секундах)
+ENTITY_CACHE_FILE = f'{DATA_DIR}/entity_cache.json'  # Кэш для быстрого перезапуска
+ENTITY_CACHE_MAX_AGE = 7 * 24 * 3600  # Записи старше этого возраста не загружаются (в секундах)
+ENTITY_CACHE_SAVE_INTERVAL = 300  # Как часто сохранять кэш на диск (в секундах)
+
+# Очередь добавления контактов
+CONTACT_ADD_CONCURRENCY = 2  # Количество одновременных запросов на добавление
+CONTACT_ADD_RATE = 0.5  # Максимальный темп добавления (контактов в секунду)
+CONTACT_ADD_BURST = 5  # Сколько добавлений можно выполнить подряд без ожидания
+
+# Постраничный вывод
+CONTACTS_PAGE_SIZE = 10  # Количество контактов на странице /contacts
+SEARCH_RESULTS_LIMIT = 20  # Максимальное количество результатов /find и inline поиска
+SEARCH_SCAN_LIMIT = 5000  # Сколько совпадений по префиксу проверяется при ранжировании
+EXPORT_BATCH_SIZE = 1000  # Количество контактов, записываемых в файл выгрузки за раз
+
+# Обработка сообщений из групп
+INGEST_DEDUP_SIZE = 10000  # Сколько последних сообщений помнить, чтобы не обработать одно дважды
+
+# Уведомления админам
+NOTIFY_CONCURRENCY = 4  # Количество одновременных отправок
+NOTIFY_GLOBAL_RATE = 25  # Общий предел сообщений в секунду (у Bot API около 30)
+NOTIFY_PER_CHAT_INTERVAL = 1.0  # Минимальный интервал между сообщениями в один чат (в секундах)
+NOTIFY_DIGEST_WINDOW = 0  # Окно сводки новых контактов (в секундах), 0 - уведомлять о каждом
+NOTIFY_MAX_RETRIES = 3  # Повторы отправки после TelegramRetryAfter
+
+# Пользователи, которых не удалось добавить: пауза до повторной попытки по причине (в секундах)
+NEGATIVE_CACHE_TTLS = {
+    'not_found': 3600,  # Не удалось найти пользователя
+    'not_user': 7 * 24 * 3600,  # Найденная сущность не является пользователем
+    'privacy': 24 * 3600,  # Пользователь запретил добавление настройками приватности
+    'add_failed': 1800  # Другая ошибка при добавлении
+}
+NEGATIVE_CACHE_MAX_TTL = 30 * 24 * 3600  # Предел паузы при повторных неудачах
+NEGATIVE_CACHE_PRUNE_INTERVAL = 3600  # Как часто удалять записи, истекшие больше NEGATIVE_CACHE_MAX_TTL назад
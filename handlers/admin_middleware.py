@@ -0,0 +1,37 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, Message, CallbackQuery, InlineQuery
+from utils.indexes import admin_index
+
+NO_RIGHTS_TEXT = "❌ У вас нет прав для выполнения этой команды."
+
+class AdminMiddleware(BaseMiddleware):
+    """
+    Проверка прав администратора для хэндлеров с флагом admin
+
+    Хэндлер помечается как flags={"admin": True}, а middleware пропускает
+    к нему только админов хотя бы одной группы. Проверка идет по индексу
+    admin_index за O(1), без чтения admins.json.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not get_flag(data, "admin"):
+            return await handler(event, data)
+
+        user = data.get("event_from_user")
+        if user is not None and admin_index.is_admin(user.id):
+            return await handler(event, data)
+
+        if isinstance(event, Message):
+            await event.reply(NO_RIGHTS_TEXT)
+        elif isinstance(event, CallbackQuery):
+            await event.answer(NO_RIGHTS_TEXT)
+        elif isinstance(event, InlineQuery):
+            await event.answer([], cache_time=5, is_personal=True)
+        return None
@@ -4,9 +4,8 @@ from aiogram.types import Message, BotCommand, KeyboardButton, ReplyKeyboardMark
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from utils.json_utils import load_json
 from utils.logger import logger
-from config import BOT_COMMANDS, ADMINS_FILE
+from config import BOT_COMMANDS
 from . import contacts_handler, group_handler, blacklist_handler, stats_handler
 
 router = Router()
@@ -76,6 +75,8 @@ async def start_command(message: Message):
             "/add_group - Добавить группу для отслеживания\n"
             "/groups - Показать список отслеживаемых групп\n"
             "/contacts - Показать список собранных контактов\n"
+            "/find - Найти контакт\n"
+            "/export - Выгрузить контакты в файл\n"
             "/blacklist - Добавить пользователя в черный список\n"
             "/blacklist_list - Показать черный список\n"
             "/stats - Показать статистику\n"
@@ -136,7 +137,7 @@ async def help_command(message: Message):
         logger.error(f"Ошибка в команде /help: {e}")
         await message.reply("❌ Произошла ошибка при отображении справки.")
 
-@router.message(F.text == "📱 Контакты")
+@router.message(F.text == "📱 Контакты", flags={"admin": True})
 @private_messages_only
 async def contacts_button(message: Message):
     """Обработчик кнопки Контакты"""
@@ -148,13 +149,13 @@ async def groups_button(message: Message):
     """Обработчик кнопки Группы"""
     await group_handler.list_groups(message)
 
-@router.message(F.text == "⛔️ Черный список")
+@router.message(F.text == "⛔️ Черный список", flags={"admin": True})
 @private_messages_only
 async def blacklist_button(message: Message):
     """Обработчик кнопки Черный список"""
     await blacklist_handler.show_blacklist(message)
 
-@router.message(F.text == "📊 Статистика")
+@router.message(F.text == "📊 Статистика", flags={"admin": True})
 @private_messages_only
 async def stats_button(message: Message):
     """Обработчик кнопки Статистика"""
@@ -223,22 +224,10 @@ async def process_group_id(message: Message, state: FSMContext):
             "ID должно начинаться с -100, например: -100123456789"
         )
 
-@router.message(F.text == "❌ Заблокировать")
+@router.message(F.text == "❌ Заблокировать", flags={"admin": True})
 @private_messages_only
 async def blacklist_add_button(message: Message, state: FSMContext):
     """Обработчик кнопки Заблокировать"""
-    # Проверяем права администратора
-    admins = load_json(ADMINS_FILE)
-    is_admin = False
-    for group_admins in admins.values():
-        if str(message.from_user.id) in group_admins:
-            is_admin = True
-            break
-            
-    if not is_admin:
-        await message.reply("❌ У вас нет прав для выполнения этой команды.")
-        return
-
     await state.set_state(BlacklistStates.waiting_for_user)
     await message.reply(
         "Отправьте ID или @username пользователя, которого хотите заблокировать.\n\n"
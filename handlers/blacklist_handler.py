@@ -3,28 +3,17 @@ from aiogram.types import Message
 from aiogram.filters import Command
 from telethon import TelegramClient
 from utils.telegram_utils import get_user_info
-from utils.json_utils import load_json, save_json, add_to_blacklist
+from utils.json_utils import store, add_to_blacklist
+from utils.indexes import contact_usernames, blacklist_usernames
 from utils.logger import logger
-from config import BLACKLIST_FILE, ADMINS_FILE, CONTACTS_FILE
+from config import BLACKLIST_FILE, CONTACTS_FILE
 
 router = Router()
 
-@router.message(Command("blacklist"))
+@router.message(Command("blacklist"), flags={"admin": True})
 async def blacklist_command(message: Message):
     """Добавляет пользователя в черный список"""
     try:
-        # Проверяем права администратора через admins.json
-        admins = load_json(ADMINS_FILE)
-        is_admin = False
-        for group_admins in admins.values():
-            if str(message.from_user.id) in group_admins:
-                is_admin = True
-                break
-                
-        if not is_admin:
-            await message.reply("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
         # Получаем ID или username пользователя из аргументов команды
         args = message.text.split()
         if len(args) != 2:
@@ -37,7 +26,7 @@ async def blacklist_command(message: Message):
         user_input = args[1].strip()
         
         # Загружаем список контактов
-        contacts = load_json(CONTACTS_FILE)
+        contacts = store.load_json(CONTACTS_FILE)
         
         # Ищем пользователя в контактах
         user_data = None
@@ -50,13 +39,10 @@ async def blacklist_command(message: Message):
                 user_data = contacts[user_id]
         # Если передан username
         elif user_input.startswith('@'):
-            username = user_input[1:]  # Убираем @
-            # Ищем пользователя по username в контактах
-            for contact_id, contact_data in contacts.items():
-                if contact_data.get('username', '').lower() == username.lower():
-                    user_data = contact_data
-                    user_id = contact_id
-                    break
+            # Ищем пользователя по username в индексе контактов
+            user_id = contact_usernames.get(user_input)
+            if user_id is not None:
+                user_data = contacts.get(user_id)
         else:
             await message.reply(
                 "❌ Неверный формат ID или username.\n"
@@ -64,6 +50,10 @@ async def blacklist_command(message: Message):
             )
             return
             
+        if not user_data and blacklist_usernames.get(user_input) is not None:
+            await message.reply("❌ Этот пользователь уже находится в черном списке.")
+            return
+            
         if not user_data:
             await message.reply(
                 "❌ Пользователь не найден в ваших контактах.\n"
@@ -72,7 +62,7 @@ async def blacklist_command(message: Message):
             return
             
         # Проверяем, не в черном ли списке уже пользователь
-        blacklist = load_json(BLACKLIST_FILE)
+        blacklist = store.load_json(BLACKLIST_FILE)
         if user_id in blacklist:
             await message.reply("❌ Этот пользователь уже находится в черном списке.")
             return
@@ -97,24 +87,12 @@ async def blacklist_command(message: Message):
         logger.error(f"Ошибка при добавлении в черный список: {e}")
         await message.reply("❌ Произошла ошибка при добавлении в черный список.")
 
-@router.message(Command("blacklist_list"))
+@router.message(Command("blacklist_list"), flags={"admin": True})
 async def show_blacklist(message: Message):
     """Показывает черный список"""
     try:
-        # Проверяем права администратора через admins.json
-        admins = load_json(ADMINS_FILE)
-        is_admin = False
-        for group_admins in admins.values():
-            if str(message.from_user.id) in group_admins:
-                is_admin = True
-                break
-                
-        if not is_admin:
-            await message.reply("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
         # Загружаем черный список
-        blacklist = load_json(BLACKLIST_FILE)
+        blacklist = store.load_json(BLACKLIST_FILE)
         
         if not blacklist:
             await message.reply("📝 Черный список пуст.")
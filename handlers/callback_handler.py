@@ -1,41 +1,33 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
-from utils.json_utils import load_json, save_json
+from utils.json_utils import store
 from utils.logger import logger
+from handlers.contacts_handler import render_contacts_page
 from config import GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE, ADMINS_FILE
 
 router = Router()
 
-async def check_admin_rights(user_id: int) -> bool:
-    """Проверяет права администратора"""
-    admins = load_json(ADMINS_FILE)
-    for group_admins in admins.values():
-        if str(user_id) in group_admins:
-            return True
-    return False
-
-@router.callback_query(F.data.startswith("delete_group_"))
+@router.callback_query(F.data.startswith("delete_group_"), flags={"admin": True})
 async def delete_group(callback: CallbackQuery):
     """Удаляет группу из списка отслеживаемых"""
     try:
-        # Проверяем права администратора
-        if not await check_admin_rights(callback.from_user.id):
-            await callback.answer("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
         group_id = callback.data.replace("delete_group_", "")
-        groups = load_json(GROUPS_FILE)
         
-        if group_id in groups:
-            group_data = groups.pop(group_id)
-            if save_json(GROUPS_FILE, groups):
-                await callback.answer(f"✅ Группа {group_data['title']} удалена")
-                await callback.message.edit_text(
-                    f"Группа {group_data['title']} удалена из списка отслеживаемых"
-                )
-                logger.info(f"Группа {group_id} удалена из списка отслеживаемых")
-            else:
-                await callback.answer("❌ Ошибка при удалении группы")
+        # Группа и ее админы удаляются вместе, не пересекаясь с /add_group
+        async with store.transaction(GROUPS_FILE, ADMINS_FILE) as tx:
+            group_data = tx.pop(GROUPS_FILE, group_id)
+            if group_data is not None:
+                # Админы удаленной группы теряют права на нее
+                tx.pop(ADMINS_FILE, group_id)
+                
+        if group_data is not None:
+            # Перестаем получать сообщения из удаленной группы
+            callback.bot.group_filter.refresh()
+            await callback.answer(f"✅ Группа {group_data['title']} удалена")
+            await callback.message.edit_text(
+                f"Группа {group_data['title']} удалена из списка отслеживаемых"
+            )
+            logger.info(f"Группа {group_id} удалена из списка отслеживаемых")
         else:
             await callback.answer("❌ Группа не найдена")
             
@@ -43,21 +35,29 @@ async def delete_group(callback: CallbackQuery):
         logger.error(f"Ошибка при удалении группы: {e}")
         await callback.answer("❌ Произошла ошибка")
 
-@router.callback_query(F.data.startswith("remove_contact_"))
+@router.callback_query(F.data.startswith("contacts_page_"), flags={"admin": True})
+async def show_contacts_page(callback: CallbackQuery):
+    """Переключает страницу списка контактов в том же сообщении"""
+    try:
+        offset = int(callback.data.replace("contacts_page_", ""))
+        response, markup = render_contacts_page(callback.from_user.id, offset)
+        await callback.message.edit_text(response, reply_markup=markup)
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Ошибка при переключении страницы контактов: {e}")
+        await callback.answer("❌ Произошла ошибка")
+
+@router.callback_query(F.data.startswith("remove_contact_"), flags={"admin": True})
 async def remove_contact(callback: CallbackQuery):
     """Удаляет контакт из списка"""
     try:
-        # Проверяем права администратора
-        if not await check_admin_rights(callback.from_user.id):
-            await callback.answer("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
         user_id = callback.data.replace("remove_contact_", "")
-        contacts = load_json(CONTACTS_FILE)
+        contacts = store.load_json(CONTACTS_FILE)
         
         if user_id in contacts:
-            contact_data = contacts.pop(user_id)
-            if save_json(CONTACTS_FILE, contacts):
+            contact_data = store.pop(CONTACTS_FILE, user_id)
+            if contact_data is not None:
                 await callback.answer(f"✅ Контакт удален")
                 await callback.message.edit_text(
                     f"Контакт {contact_data.get('first_name', '')} {contact_data.get('last_name', '')} удален"
@@ -72,21 +72,16 @@ async def remove_contact(callback: CallbackQuery):
         logger.error(f"Ошибка при удалении контакта: {e}")
         await callback.answer("❌ Произошла ошибка")
 
-@router.callback_query(F.data.startswith("remove_blacklist_"))
+@router.callback_query(F.data.startswith("remove_blacklist_"), flags={"admin": True})
 async def remove_from_blacklist(callback: CallbackQuery):
     """Удаляет пользователя из черного списка"""
     try:
-        # Проверяем права администратора
-        if not await check_admin_rights(callback.from_user.id):
-            await callback.answer("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
         user_id = callback.data.replace("remove_blacklist_", "")
-        blacklist = load_json(BLACKLIST_FILE)
+        blacklist = store.load_json(BLACKLIST_FILE)
         
         if user_id in blacklist:
-            user_data = blacklist.pop(user_id)
-            if save_json(BLACKLIST_FILE, blacklist):
+            user_data = store.pop(BLACKLIST_FILE, user_id)
+            if user_data is not None:
                 await callback.answer("✅ Пользователь удален из черного списка")
                 await callback.message.edit_text(
                     f"Пользователь {user_data.get('first_name', '')} {user_data.get('last_name', '')} "
@@ -1,84 +1,241 @@
+import os
+import tempfile
+from datetime import datetime
+from html import escape
+from typing import Optional, Tuple
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import (
+    Message, CallbackQuery, InlineKeyboardMarkup, FSInputFile,
+    InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+)
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from telethon import TelegramClient
-from utils.telegram_utils import add_contact_to_telegram
-from utils.json_utils import add_contact, load_json, is_in_blacklist
+from utils.json_utils import store
+from utils.negative_cache import negative_cache
+from utils.indexes import admin_index, contact_search, group_contacts
+from utils.export import FORMATS, export_contacts, parse_date, parse_group_id
 from utils.logger import logger
-from config import CONTACTS_FILE, BLACKLIST_FILE, ADMINS_FILE
+from config import CONTACTS_FILE, CONTACTS_PAGE_SIZE, SEARCH_RESULTS_LIMIT
 
 router = Router()
 
-@router.message(Command("contacts"))
+def render_contacts_page(admin_id: int, offset: int) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """
+    Формирует страницу списка контактов из групп админа и кнопки навигации
+
+    Страница строится по индексу group_contacts, поэтому не требует
+    перебора всей базы контактов.
+
+    Args:
+        admin_id: ID админа, чьи группы показываются
+        offset: Позиция первого контакта на странице
+    """
+    contacts = store.load_json(CONTACTS_FILE)
+    total = group_contacts.admin_count(admin_id)
+    if not total:
+        # Например, контакты удалены, пока было открыто сообщение со списком
+        return "📝 Список контактов пуст.", None
+    # После удаления контактов страница могла оказаться за концом списка
+    offset = max(0, min(offset, (total - 1) // CONTACTS_PAGE_SIZE * CONTACTS_PAGE_SIZE))
+    page = offset // CONTACTS_PAGE_SIZE + 1
+    pages = (total + CONTACTS_PAGE_SIZE - 1) // CONTACTS_PAGE_SIZE
+    
+    response = f"📋 Контакты из ваших групп ({total}), страница {page}/{pages}:\n\n"
+    for user_id in group_contacts.admin_page(admin_id, offset, CONTACTS_PAGE_SIZE):
+        user_data = contacts[user_id]
+        response += (
+            f"👤 {escape(user_data.get('first_name') or '')} {escape(user_data.get('last_name') or '')}\n"
+            f"🔗 @{escape(user_data.get('username') or 'Нет username')}\n"
+            f"📅 Добавлен: {user_data['added_date']}\n\n"
+        )
+        
+    if pages < 2:
+        return response, None
+        
+    builder = InlineKeyboardBuilder()
+    if offset > 0:
+        builder.button(text="⬅️ Назад", callback_data=f"contacts_page_{offset - CONTACTS_PAGE_SIZE}")
+    if offset + CONTACTS_PAGE_SIZE < total:
+        builder.button(text="Вперед ➡️", callback_data=f"contacts_page_{offset + CONTACTS_PAGE_SIZE}")
+    return response, builder.as_markup()
+
+@router.message(Command("contacts"), flags={"admin": True})
 async def list_contacts(message: Message):
-    """Показывает список добавленных контактов"""
+    """Показывает первую страницу списка контактов из групп админа"""
     try:
-        # Проверяем права администратора через admins.json
-        admins = load_json(ADMINS_FILE)
-        is_admin = False
-        for group_admins in admins.values():
-            if str(message.from_user.id) in group_admins:
-                is_admin = True
-                break
-                
-        if not is_admin:
-            await message.reply("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
-        # Загружаем список контактов
-        contacts = load_json(CONTACTS_FILE)
-        
-        if not contacts:
+        if not group_contacts.admin_count(message.from_user.id):
             await message.reply("📝 Список контактов пуст.")
             return
             
-        # Формируем сообщение со списком контактов
-        response = "📋 Список добавленных контактов:\n\n"
-        for user_id, user_data in contacts.items():
-            response += (
-                f"👤 {user_data.get('first_name', '')} {user_data.get('last_name', '')}\n"
-                f"🔗 @{user_data.get('username', 'Нет username')}\n"
-                f"📅 Добавлен: {user_data['added_date']}\n\n"
-            )
-            
-        # Разбиваем сообщение на части, если оно слишком длинное
-        if len(response) > 4096:
-            for x in range(0, len(response), 4096):
-                await message.reply(response[x:x+4096])
-        else:
-            await message.reply(response)
+        # Остальные страницы открываются кнопками, сообщение редактируется на месте
+        response, markup = render_contacts_page(message.from_user.id, 0)
+        await message.reply(response, reply_markup=markup)
             
     except Exception as e:
         logger.error(f"Ошибка при выводе списка контактов: {e}")
         await message.reply("❌ Произошла ошибка при получении списка контактов.")
 
-async def process_new_contact(message: Message, user_data: dict) -> bool:
-    """Обрабатывает нового пользователя"""
+def format_contact(user_data: dict) -> str:
+    """Карточка контакта для результатов поиска"""
+    return (
+        f"👤 {escape(user_data.get('first_name') or '')} {escape(user_data.get('last_name') or '')}\n"
+        f"🔗 @{escape(user_data.get('username') or 'Нет username')}\n"
+        f"📱 {escape(user_data.get('phone') or 'Нет телефона')}\n"
+        f"🆔 {user_data['id']}\n"
+        f"📅 Добавлен: {user_data['added_date']}"
+    )
+
+@router.message(Command("find"), flags={"admin": True})
+async def find_contacts(message: Message):
+    """Ищет контакты по имени, фамилии, username или телефону"""
+    try:
+        query = message.text.partition(' ')[2].strip()
+        if not query:
+            await message.reply(
+                "❌ Неверный формат команды.\n"
+                "Используйте: /find <имя, username или телефон>"
+            )
+            return
+            
+        contacts = store.load_json(CONTACTS_FILE)
+        # Ищем только среди контактов из групп админа
+        user_ids = contact_search.search(
+            query, SEARCH_RESULTS_LIMIT, among=group_contacts.admin_contacts(message.from_user.id)
+        )
+        if not user_ids:
+            await message.reply("📝 Ничего не найдено.")
+            return
+            
+        response = f"🔍 Найдено по запросу «{escape(query)}»:\n\n"
+        response += "\n\n".join(format_contact(contacts[user_id]) for user_id in user_ids)
+        await message.reply(response)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при поиске контактов: {e}")
+        await message.reply("❌ Произошла ошибка при поиске контактов.")
+
+@router.inline_query(flags={"admin": True})
+async def inline_find_contacts(inline_query: InlineQuery):
+    """Поиск контактов в inline режиме: @бот <запрос>"""
+    try:
+        contacts = store.load_json(CONTACTS_FILE)
+        results = []
+        admin_contacts = group_contacts.admin_contacts(inline_query.from_user.id)
+        for user_id in contact_search.search(inline_query.query, SEARCH_RESULTS_LIMIT, among=admin_contacts):
+            user_data = contacts[user_id]
+            name = f"{user_data.get('first_name') or ''} {user_data.get('last_name') or ''}".strip()
+            results.append(InlineQueryResultArticle(
+                id=user_id,
+                title=name or user_id,
+                description=f"@{user_data['username']}" if user_data.get('username') else user_data.get('phone') or None,
+                input_message_content=InputTextMessageContent(message_text=format_contact(user_data))
+            ))
+        # Результаты зависят от прав пользователя, поэтому не кэшируются для других
+        await inline_query.answer(results, cache_time=5, is_personal=True)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при inline поиске контактов: {e}")
+
+@router.message(Command("export"), flags={"admin": True})
+async def export_command(message: Message):
+    """
+    Выгружает контакты из групп админа файлом
+
+    Формат: /export [csv|jsonl|vcard] [ID или @username группы] [с ДД.ММ.ГГГГ] [по ДД.ММ.ГГГГ]
+    """
+    file_path = None
     try:
-        user_id = user_data['id']
+        args = message.text.split()[1:]
+        export_format = 'csv'
+        if args and args[0].lower() in FORMATS:
+            export_format = args.pop(0).lower()
+            
+        # Даты узнаем по формату, остальной аргумент считаем ID группы
+        filters = {}
+        dates = []
+        group_arg = None
+        for arg in args:
+            try:
+                datetime.strptime(arg, "%d.%m.%Y")
+                dates.append(arg)
+            except ValueError:
+                group_arg = arg
+        if len(dates) > 2 or len(args) - len(dates) > 1:
+            await message.reply(
+                "❌ Формат: /export [csv|jsonl|vcard] [ID или @username группы] [с ДД.ММ.ГГГГ] [по ДД.ММ.ГГГГ]"
+            )
+            return
+        if group_arg is not None:
+            group_id = parse_group_id(group_arg)
+            if group_id is None or group_id not in admin_index.groups_of(message.from_user.id):
+                await message.reply("❌ Группа не найдена среди ваших групп.")
+                return
+            filters['group_id'] = group_id
+        if dates:
+            filters['date_from'] = parse_date(dates[0])
+        if len(dates) == 2:
+            filters['date_to'] = parse_date(dates[1], end=True)
+            
+        _, extension = FORMATS[export_format]
+        fd, file_path = tempfile.mkstemp(suffix=f'.{extension}')
+        os.close(fd)
+        count = await export_contacts(file_path, export_format, admin_id=message.from_user.id, **filters)
+        if not count:
+            await message.reply("📝 Нет контактов для выгрузки.")
+            return
+            
+        await message.reply_document(
+            FSInputFile(file_path, filename=f"contacts_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}"),
+            caption=f"📤 Выгружено контактов: {count}"
+        )
         
-        # Проверяем черный список
-        if is_in_blacklist(BLACKLIST_FILE, user_id):
-            logger.info(f"Пользователь {user_id} находится в черном списке")
-            return False
+    except Exception as e:
+        logger.error(f"Ошибка при выгрузке контактов: {e}")
+        await message.reply("❌ Произошла ошибка при выгрузке контактов.")
+    finally:
+        if file_path:
+            os.remove(file_path)
+
+@router.message(Command("failed"), flags={"admin": True})
+async def show_failed_contacts(message: Message):
+    """Показывает пользователей, которых не удалось добавить и которые временно пропускаются"""
+    try:
+        entries = negative_cache.entries(limit=50)
+        if not entries:
+            await message.reply("📝 Список неудачных добавлений пуст.")
+            return
             
-        # Проверяем, есть ли уже такой контакт
-        contacts = load_json(CONTACTS_FILE)
-        if str(user_id) in contacts:
-            logger.info(f"Пользователь {user_id} уже добавлен в контакты")
-            return False
+        response = "⚠️ Не удалось добавить (повтор будет позже):\n\n"
+        for user_id, entry in entries:
+            response += (
+                f"🆔 {user_id}\n"
+                f"❗️ Причина: {entry['reason']} (попыток: {entry['failures']})\n"
+                f"📅 Последняя попытка: {entry['updated']}\n\n"
+            )
+        response += "Очистить: /failed_clear или /failed_clear <ID>"
+        
+        await message.reply(response)
+        
+    except Exception as e:
+        logger.error(f"Ошибка при выводе списка неудачных добавлений: {e}")
+        await message.reply("❌ Произошла ошибка при получении списка неудачных добавлений.")
+
+@router.message(Command("failed_clear"), flags={"admin": True})
+async def clear_failed_contacts(message: Message):
+    """Очищает список неудачных добавлений целиком или для одного пользователя"""
+    try:
+        args = message.text.split()
+        if len(args) == 2:
+            if negative_cache.forget(args[1]):
+                await message.reply(f"✅ Пользователь {args[1]} будет добавлен при следующем сообщении.")
+            else:
+                await message.reply("❌ Пользователь не найден в списке неудачных добавлений.")
+            return
             
-        # Добавляем в контакты Telegram
-        result = await add_contact_to_telegram(message.bot.client, user_data)
-        if result:
-            # Сохраняем в JSON
-            if add_contact(CONTACTS_FILE, result):
-                logger.info(f"Пользователь {user_id} успешно добавлен в контакты")
-                return True
-                
-        return False
+        count = negative_cache.clear()
+        await message.reply(f"✅ Список неудачных добавлений очищен ({count} записей).")
         
     except Exception as e:
-        logger.error(f"Ошибка при обработке нового контакта: {e}")
-        return False 
\ No newline at end of file
+        logger.error(f"Ошибка при очистке списка неудачных добавлений: {e}")
+        await message.reply("❌ Произошла ошибка при очистке списка неудачных добавлений.")
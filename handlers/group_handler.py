@@ -3,9 +3,10 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from utils.json_utils import load_json, save_json, add_group
+from utils.json_utils import store, add_group
 from utils.logger import logger
 from utils.telegram_utils import get_group_info, is_admin_in_group
+from utils.indexes import admin_index
 from config import GROUPS_FILE, ADMINS_FILE
 
 router = Router()
@@ -49,23 +50,25 @@ async def add_group_command(message: Message):
                 )
                 return
                 
-            # Добавляем группу в список
-            if add_group(GROUPS_FILE, group_info):
-                # Добавляем пользователя как админа группы
-                admins = load_json(ADMINS_FILE)
-                group_id_str = str(group_info['id'])
-                
-                if group_id_str not in admins:
-                    admins[group_id_str] = {}
+            # Группа и ее первый админ записываются вместе: между проверкой
+            # и записью другая команда не успеет добавить ту же группу
+            group_id_str = str(group_info['id'])
+            async with store.transaction(GROUPS_FILE, ADMINS_FILE, durable=True) as tx:
+                added = add_group(GROUPS_FILE, group_info, tx)
+                if added:
+                    # Добавляем пользователя как админа группы
+                    group_admins = dict(tx.get(ADMINS_FILE, group_id_str, {}))
+                    group_admins[str(user_id)] = {
+                        'added_date': group_info['added_date'],
+                        'username': message.from_user.username,
+                        'first_name': message.from_user.first_name,
+                        'last_name': message.from_user.last_name
+                    }
+                    tx.put(ADMINS_FILE, group_id_str, group_admins)
                     
-                admins[group_id_str][str(user_id)] = {
-                    'added_date': group_info['added_date'],
-                    'username': message.from_user.username,
-                    'first_name': message.from_user.first_name,
-                    'last_name': message.from_user.last_name
-                }
-                
-                save_json(ADMINS_FILE, admins)
+            if added:
+                # Начинаем получать сообщения из новой группы
+                message.bot.group_filter.refresh()
                 
                 # Отправляем уведомление
                 await message.answer(
@@ -94,21 +97,15 @@ async def add_group_command(message: Message):
 async def list_groups(message: Message):
     """Показывает список добавленных групп"""
     try:
-        user_id = str(message.from_user.id)
-        admins = load_json(ADMINS_FILE)
-        
         # Находим группы, где пользователь является админом
-        admin_groups = []
-        for group_id, group_admins in admins.items():
-            if user_id in group_admins:
-                admin_groups.append(group_id)
+        admin_groups = admin_index.groups_of(message.from_user.id)
                 
         if not admin_groups:
             await message.reply("📝 У вас нет добавленных групп.")
             return
             
         # Загружаем список групп
-        groups = load_json(GROUPS_FILE)
+        groups = store.load_json(GROUPS_FILE)
         
         # Формируем сообщение со списком групп
         response = "📋 Ваши группы:\n\n"
@@ -120,7 +117,7 @@ async def list_groups(message: Message):
                     f"👥 Участников: {group_data['participants_count']}\n"
                     f"📊 Добавлено контактов: {group_data['contacts_count']}\n"
                     f"📅 Дата добавления: {group_data['added_date']}\n"
-                    f"🔗 {f'@{group_data['username']}' if group_data['username'] else 'Нет username'}\n\n"
+                    f"🔗 {'@' + group_data['username'] if group_data['username'] else 'Нет username'}\n\n"
                 )
             
         await message.reply(response)
@@ -2,7 +2,7 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
 from telethon import TelegramClient
-from utils.json_utils import add_group, load_json
+from utils.json_utils import add_group, store
 from utils.logger import logger
 from config import GROUPS_FILE, ADMIN_ID
 
@@ -68,7 +68,7 @@ async def show_groups(message: Message):
             return
             
         # Загружаем список групп
-        groups = load_json(GROUPS_FILE)
+        groups = store.load_json(GROUPS_FILE)
         
         if not groups:
             await message.reply("📝 Список групп пуст.")
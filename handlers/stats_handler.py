@@ -1,65 +1,81 @@
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
-from utils.json_utils import load_json, update_stats
+from utils.json_utils import store, update_stats, rebuild_stats
+from utils.indexes import admin_index, group_contacts
 from utils.logger import logger
 from config import (
     STATS_FILE,
     GROUPS_FILE,
     CONTACTS_FILE,
-    BLACKLIST_FILE,
-    ADMINS_FILE
+    BLACKLIST_FILE
 )
 
 router = Router()
 
-@router.message(Command("stats"))
+@router.message(Command("stats"), flags={"admin": True})
 async def show_stats(message: Message):
     """Показывает статистику"""
     try:
-        # Проверяем права администратора через admins.json
-        admins = load_json(ADMINS_FILE)
-        is_admin = False
-        for group_admins in admins.values():
-            if str(message.from_user.id) in group_admins:
-                is_admin = True
-                break
-                
-        if not is_admin:
-            await message.reply("❌ У вас нет прав для выполнения этой команды.")
-            return
-            
-        # Обновляем статистику
+        # Обновляем статистику по счетчикам
         update_stats(STATS_FILE, GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE)
         
         # Загружаем статистику
-        stats = load_json(STATS_FILE)
+        stats = store.load_json(STATS_FILE)
         
         if not stats:
             await message.reply("📊 Статистика пуста.")
             return
             
         # Формируем сообщение
+        admin_groups = admin_index.groups_of(message.from_user.id)
         response = (
             "📊 Статистика бота\n\n"
             f"👥 Добавлено контактов: {stats['total_contacts']}\n"
+            f"👤 Из них в ваших группах: {group_contacts.admin_count(message.from_user.id)}\n"
             f"👥 Групп в обработке: {stats['total_groups']}\n"
             f"⛔️ В черном списке: {stats['blacklisted']}\n\n"
-            "📈 Статистика по группам:\n\n"
+            "📈 Статистика по вашим группам:\n\n"
         )
         
-        # Добавляем статистику по каждой группе
+        # Добавляем статистику по каждой группе админа
         for group in stats['groups_stats']:
+            if group['id'] not in admin_groups:
+                continue
             response += (
                 f"📌 {group['title']}\n"
                 f"🔗 @{group['username']}\n"
-                f"👥 Добавлено контактов: {group['contacts_count']}\n\n"
+                f"👥 Контактов: {group_contacts.group_count(group['id'])}\n\n"
             )
             
+        # Состояние очереди добавления контактов
+        queue_stats = message.bot.contact_scheduler.stats()
+        response += (
+            f"⏳ В очереди на добавление: {queue_stats['queue_depth']}\n"
+            f"⌛️ Среднее ожидание в очереди: {queue_stats['avg_wait']} сек.\n"
+        )
+        if queue_stats['paused_for']:
+            response += f"⏸ Пауза из-за ограничений Telegram: {queue_stats['paused_for']} сек.\n"
+        notify_stats = message.bot.notifier.stats()
+        response += f"📨 Уведомлений в очереди: {notify_stats['queue_depth'] + notify_stats['digest_pending']}\n"
+            
         response += f"\n🕒 Последнее обновление: {stats['last_update']}"
         
         await message.reply(response)
         
     except Exception as e:
         logger.error(f"Ошибка при выводе статистики: {e}")
-        await message.reply("❌ Произошла ошибка при получении статистики.") 
\ No newline at end of file
+        await message.reply("❌ Произошла ошибка при получении статистики.") 
+
+@router.message(Command("stats_rebuild"), flags={"admin": True})
+async def rebuild_stats_command(message: Message):
+    """Полностью пересчитывает статистику по базе (восстановление счетчиков)"""
+    try:
+        if rebuild_stats(STATS_FILE, GROUPS_FILE, CONTACTS_FILE, BLACKLIST_FILE):
+            await message.reply("✅ Статистика пересчитана.")
+        else:
+            await message.reply("❌ Произошла ошибка при пересчете статистики.")
+            
+    except Exception as e:
+        logger.error(f"Ошибка при пересчете статистики: {e}")
+        await message.reply("❌ Произошла ошибка при пересчете статистики.")
\ No newline at end of file
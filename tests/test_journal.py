@@ -0,0 +1,24 @@
+import json
+import pytest
+from utils.journal import Journal
+from utils.json_utils import CorruptedFileError
+
+def record(key, value):
+    return json.dumps({'op': 'put', 'file': 'contacts', 'key': key, 'value': value}) + '\n'
+
+def test_replay_drops_torn_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(record('1', 1) + record('2', 2)[:10])
+    data = {'contacts': {}}
+
+    assert Journal(str(path), ['contacts']).replay(data) == 1
+    assert data['contacts'] == {'1': 1}
+    # Обрезанная строка отрезана, и новая запись не склеится с ней
+    assert path.read_text() == record('1', 1)
+
+def test_replay_rejects_corruption_before_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(record('1', 1) + '{"op": \n' + record('3', 3))
+
+    with pytest.raises(CorruptedFileError):
+        Journal(str(path), ['contacts']).replay({'contacts': {}})
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+import utils.json_utils as json_utils
+from utils.json_utils import DataStore
+from config import CONTACTS_FILE, GROUPS_FILE, BLACKLIST_FILE, STATS_FILE
+
+DEFAULT_FILES = {CONTACTS_FILE: {}, GROUPS_FILE: {}, BLACKLIST_FILE: {}, STATS_FILE: {}}
+
+def test_sharded_snapshot_survives_skipped_compaction(tmp_path, monkeypatch):
+    """Изменения шардов не теряются, если сжатие пропущено из-за ошибки другой коллекции"""
+    monkeypatch.chdir(tmp_path)
+    save_json = json_utils.save_json
+    failures = []
+
+    def flaky_save_json(file_path, data, data_format=None):
+        if file_path in failures:
+            failures.remove(file_path)
+            return False
+        return save_json(file_path, data, data_format)
+
+    monkeypatch.setattr(json_utils, 'save_json', flaky_save_json)
+
+    async def write():
+        store = DataStore()
+        store.open(DEFAULT_FILES)
+        # Запись статистики не удается один раз, и сжатие в этой пачке пропускается
+        failures.append(STATS_FILE)
+        store.put(STATS_FILE, 'total_contacts', 1)
+        store.put(CONTACTS_FILE, '1', {'id': 1})
+        assert not await store.flush_async(compact=True)
+        store.put(CONTACTS_FILE, '2', {'id': 2})
+        assert await store.flush_async(compact=True)
+        await store.close()
+
+    async def read():
+        store = DataStore()
+        store.open(DEFAULT_FILES)
+        contacts = dict(store.load_json(CONTACTS_FILE))
+        await store.close()
+        return contacts
+
+    asyncio.run(write())
+    assert sorted(asyncio.run(read())) == ['1', '2']
+
+def test_sharded_contacts_survive_sqlite_import_and_unsharding(tmp_path, monkeypatch):
+    """После разбиения на шарды прежний contacts.json не читается ни при переносе в SQLite, ни без SHARDED_FILES"""
+    monkeypatch.chdir(tmp_path)
+
+    async def write():
+        store = DataStore()
+        store.open(DEFAULT_FILES)
+        store.put(CONTACTS_FILE, '1', {'id': 1})
+        await store.close()
+
+    async def read():
+        store = DataStore()
+        store.open(DEFAULT_FILES)
+        contacts = dict(store.load_json(CONTACTS_FILE))
+        await store.close()
+        return contacts
+
+    asyncio.run(write())
+    assert not (tmp_path / CONTACTS_FILE).exists()
+
+    monkeypatch.setattr(json_utils, 'SHARDED_FILES', {})
+    assert sorted(asyncio.run(read())) == ['1']
+
+    monkeypatch.setattr(json_utils, 'STORAGE_BACKEND', 'sqlite')
+    assert sorted(asyncio.run(read())) == ['1']
+
+def test_sqlite_import_refuses_uncompacted_journal(tmp_path, monkeypatch):
+    """Перенос в SQLite не теряет изменения, которые есть только в журнале"""
+    monkeypatch.chdir(tmp_path)
+    store = DataStore()
+    store.open(DEFAULT_FILES)
+    store.put(CONTACTS_FILE, '1', {'id': 1})
+    # Сбой без сжатия журнала: изменения есть только в journal.jsonl
+    asyncio.run(store.flush_async())
+
+    monkeypatch.setattr(json_utils, 'STORAGE_BACKEND', 'sqlite')
+    with pytest.raises(RuntimeError):
+        DataStore().open(DEFAULT_FILES)
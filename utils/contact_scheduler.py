@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Set, Callable, Awaitable
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+from utils.json_utils import store
+from utils.logger import logger
+from utils.rate_limit import TokenBucket
+from utils.telegram_utils import add_contact_to_telegram
+from config import CONTACT_ADD_CONCURRENCY, CONTACT_ADD_RATE, CONTACT_ADD_BURST, CONTACTS_FILE
+
+class ContactAddScheduler:
+    """
+    Очередь добавления контактов в Telegram
+
+    Обработчик сообщений только ставит пользователя в очередь и сразу
+    возвращается. Воркеры (не больше concurrency одновременно) забирают
+    заявки с темпом не выше rate в секунду. При FloodWaitError все воркеры
+    останавливаются на указанное Telegram время, после чего заявка
+    повторяется и работа продолжается автоматически.
+    """
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        on_added: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]],
+        concurrency: int = CONTACT_ADD_CONCURRENCY,
+        rate: float = CONTACT_ADD_RATE,
+        burst: float = CONTACT_ADD_BURST
+    ):
+        self.client = client
+        self.on_added = on_added
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # ID пользователей в очереди или в работе, чтобы не добавлять дважды
+        self._pending: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self._resume_at = 0.0
+        self.processed = 0
+        self.flood_waits = 0
+        self._total_wait = 0.0
+        # Заявки, дошедшие до запроса к Telegram: по ним считается среднее ожидание
+        self._waited = 0
+
+    def submit(self, user_data: Dict[str, Any]) -> bool:
+        """
+        Ставит пользователя в очередь на добавление
+
+        Returns:
+            False если пользователь уже стоит в очереди
+        """
+        user_id = str(user_data['id'])
+        if user_id in self._pending:
+            return False
+        self._pending.add(user_id)
+        self.queue.put_nowait((time.monotonic(), user_data))
+        return True
+
+    def is_pending(self, user_id: Any) -> bool:
+        """Проверяет, стоит ли пользователь в очереди или добавляется сейчас"""
+        return str(user_id) in self._pending
+
+    def start(self) -> None:
+        """Запускает воркеры"""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+            ]
+
+    async def stop(self) -> None:
+        """Останавливает воркеры, незавершенные заявки отбрасываются"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _pause(self, seconds: float) -> None:
+        """Приостанавливает все воркеры на время, указанное Telegram"""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+        self.bucket.drain()
+        self.flood_waits += 1
+
+    async def _wait_resume(self) -> None:
+        """Ждет окончания паузы после FloodWait"""
+        delay = self._resume_at - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._resume_at - time.monotonic()
+
+    async def _worker(self) -> None:
+        while True:
+            enqueued_at, user_data = await self.queue.get()
+            try:
+                await self._process(user_data, enqueued_at)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке заявки на добавление {user_data.get('id')}: {e}")
+            finally:
+                self._pending.discard(str(user_data['id']))
+                self.processed += 1
+                self.queue.task_done()
+
+    async def _process(self, user_data: Dict[str, Any], enqueued_at: float) -> None:
+        """Добавляет контакт, повторяя попытку после FloodWait"""
+        # Пока заявка ждала, контакт мог быть добавлен по другому сообщению
+        if str(user_data['id']) in store.load_json(CONTACTS_FILE):
+            return
+            
+        first_attempt = True
+        while True:
+            await self._wait_resume()
+            await self.bucket.acquire()
+            # Пауза могла начаться, пока воркер ждал токен
+            await self._wait_resume()
+            if first_attempt:
+                # Время от постановки в очередь до первого запроса к Telegram
+                self._total_wait += time.monotonic() - enqueued_at
+                self._waited += 1
+                first_attempt = False
+            try:
+                result = await add_contact_to_telegram(self.client, user_data)
+                break
+            except FloodWaitError as e:
+                logger.warning(f"FloodWait при добавлении контакта, пауза {e.seconds} сек.")
+                self._pause(e.seconds)
+
+        if result:
+            await self.on_added(user_data, result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние очереди: глубина, пауза и среднее время ожидания"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'in_progress': len(self._pending) - self.queue.qsize(),
+            'paused_for': max(0.0, round(self._resume_at - time.monotonic(), 1)),
+            'avg_wait': round(self._total_wait / self._waited, 1) if self._waited else 0.0,
+            'processed': self.processed,
+            'flood_waits': self.flood_waits
+        }
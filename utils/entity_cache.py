@@ -0,0 +1,254 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+from telethon import TelegramClient
+from telethon.tl.types import User, Channel, Chat, ChatPhotoEmpty
+from telethon.utils import get_peer_id
+from utils.json_utils import load_json, save_json, CorruptedFileError
+from utils.logger import logger
+from config import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL, ENTITY_CACHE_MAX_AGE, ENTITY_CACHE_SAVE_INTERVAL
+
+EntityKey = Union[int, str]
+
+# Версия формата файла кэша, при несовпадении файл игнорируется
+CACHE_FILE_VERSION = 1
+
+def entity_to_record(entity: Any) -> Optional[Dict[str, Any]]:
+    """Сохраняет данные сущности, нужные для запросов к Telegram, в словарь"""
+    if isinstance(entity, User):
+        return {
+            'type': 'user',
+            'id': entity.id,
+            'access_hash': entity.access_hash,
+            'username': entity.username,
+            'first_name': entity.first_name,
+            'last_name': entity.last_name,
+            'phone': entity.phone
+        }
+    if isinstance(entity, Channel):
+        return {
+            'type': 'channel',
+            'id': entity.id,
+            'access_hash': entity.access_hash,
+            'username': entity.username,
+            'title': entity.title,
+            'megagroup': entity.megagroup
+        }
+    if isinstance(entity, Chat):
+        return {'type': 'chat', 'id': entity.id, 'title': entity.title}
+    return None
+
+def record_to_entity(record: Dict[str, Any]) -> Optional[Any]:
+    """Восстанавливает сущность Telethon из сохраненного словаря"""
+    if record.get('type') == 'user':
+        return User(
+            id=record['id'],
+            access_hash=record['access_hash'],
+            username=record.get('username'),
+            first_name=record.get('first_name'),
+            last_name=record.get('last_name'),
+            phone=record.get('phone')
+        )
+    if record.get('type') == 'channel':
+        return Channel(
+            id=record['id'],
+            title=record.get('title') or '',
+            photo=ChatPhotoEmpty(),
+            date=None,
+            access_hash=record['access_hash'],
+            username=record.get('username'),
+            megagroup=record.get('megagroup')
+        )
+    if record.get('type') == 'chat':
+        return Chat(
+            id=record['id'],
+            title=record.get('title') or '',
+            photo=ChatPhotoEmpty(),
+            participants_count=0,
+            date=None,
+            version=0
+        )
+    return None
+
+class EntityCache:
+    """
+    Общий кэш сущностей Telegram (пользователи, группы, каналы)
+
+    Записи доступны по ID (в формате Telethon, с -100 для каналов) и по
+    username без учета регистра. Размер ограничен: при переполнении
+    вытесняются давно не использованные записи, а устаревшие по TTL
+    записи считаются промахом и запрашиваются заново.
+
+    Кэш периодически и при остановке сохраняется в файл и загружается
+    при запуске, чтобы после перезапуска (в том числе после сбоя)
+    не запрашивать все сущности заново. Срок жизни загруженной записи
+    отсчитывается от времени ее получения, а не от загрузки.
+    """
+
+    def __init__(self, max_size: int = ENTITY_CACHE_SIZE, ttl: float = ENTITY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Ключ -> (время истечения, сущность, время получения в unix time)
+        self._entries: "OrderedDict[EntityKey, tuple]" = OrderedDict()
+        self._save_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _normalize(key: EntityKey) -> EntityKey:
+        """Приводит ключ к единому виду: ID как есть, username без @ и в нижнем регистре"""
+        if isinstance(key, str):
+            return key.lstrip('@').casefold()
+        return key
+
+    def get(self, key: EntityKey) -> Optional[Any]:
+        """Возвращает сущность из кэша или None"""
+        key = self._normalize(key)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, entity: Any, cached_at: Optional[float] = None) -> None:
+        """Сохраняет сущность в кэш, например полученную из события"""
+        # Min-сущности приходят без полноценного access_hash, их нельзя использовать в запросах
+        if entity is None or getattr(entity, 'min', False):
+            return
+        try:
+            keys = [get_peer_id(entity)]
+        except (TypeError, ValueError):
+            return
+        username = getattr(entity, 'username', None)
+        if username:
+            keys.append(self._normalize(username))
+
+        now = time.time()
+        cached_at = cached_at or now
+        # Для восстановленной из файла записи часть срока жизни уже прошла
+        expires = time.monotonic() + self.ttl - (now - cached_at)
+        for key in keys:
+            self._entries[key] = (expires, entity, cached_at)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_entity(self, client: TelegramClient, key: EntityKey) -> Any:
+        """
+        Получает сущность из кэша, а при промахе - через client.get_entity
+
+        Args:
+            client: Экземпляр TelegramClient
+            key: ID сущности или username
+
+        Returns:
+            Сущность Telegram. Ошибки client.get_entity пробрасываются вызывающему.
+        """
+        entity = self.get(key)
+        if entity is None:
+            entity = await client.get_entity(key)
+            self.put(entity)
+        return entity
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Содержимое файла кэша с временем получения каждой сущности"""
+        records = {}
+        for _, entity, cached_at in self._entries.values():
+            record = entity_to_record(entity)
+            if record is not None:
+                records[str(get_peer_id(entity))] = {**record, 'cached_at': cached_at}
+        return {
+            'version': CACHE_FILE_VERSION,
+            'saved_at': datetime.now().isoformat(),
+            'entities': records
+        }
+
+    def save(self, file_path: str) -> bool:
+        """Сохраняет кэш в файл"""
+        return save_json(file_path, self._snapshot())
+
+    async def _save_loop(self, file_path: str, interval: float) -> None:
+        """Фоновое сохранение кэша, чтобы он пережил аварийную остановку"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Снимок берется в потоке событий, запись на диск - в отдельном потоке
+                await asyncio.to_thread(save_json, file_path, self._snapshot())
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении кэша сущностей: {e}")
+
+    def start(self, file_path: str, interval: float = ENTITY_CACHE_SAVE_INTERVAL) -> None:
+        """Запускает периодическое сохранение кэша в файл"""
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_loop(file_path, interval))
+
+    async def stop(self) -> None:
+        """Останавливает периодическое сохранение"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+            self._save_task = None
+
+    def load(self, file_path: str, max_age: float = ENTITY_CACHE_MAX_AGE) -> int:
+        """
+        Загружает сохраненный кэш, пропуская записи старше max_age секунд
+        и записи, срок жизни которых (ttl от времени получения) уже истек
+
+        Returns:
+            Количество загруженных сущностей
+        """
+        if not Path(file_path).exists():
+            return 0
+        try:
+            data = load_json(file_path)
+        except CorruptedFileError:
+            # Кэш восстановится запросами к Telegram, поврежденный файл не страшен
+            return 0
+        if not data:
+            return 0
+        if data.get('version') != CACHE_FILE_VERSION:
+            logger.info(f"Файл кэша {file_path} другой версии, кэш не загружен")
+            return 0
+
+        loaded = 0
+        # Истекшие записи все равно были бы запрошены заново при первом обращении
+        oldest = time.time() - min(max_age, self.ttl)
+        # Сначала самые старые записи, чтобы свежие оказались в конце очереди LRU
+        records = sorted(data.get('entities', {}).values(), key=lambda r: r.get('cached_at', 0))
+        for record in records:
+            if record.get('cached_at', 0) < oldest:
+                continue
+            try:
+                entity = record_to_entity(record)
+            except (KeyError, TypeError) as e:
+                logger.debug(f"Пропущена запись кэша {record.get('id')}: {e}")
+                continue
+            if entity is not None:
+                self.put(entity, cached_at=record['cached_at'])
+                loaded += 1
+        logger.info(f"Из {file_path} загружено {loaded} сущностей")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика кэша для подбора размера"""
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0
+        }
+
+# Общий кэш сущностей процесса
+entity_cache = EntityCache()
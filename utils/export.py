@@ -0,0 +1,168 @@
+import asyncio
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, TextIO
+from utils.json_utils import store
+from utils.indexes import group_contacts
+from utils.sqlite_storage import normalize_date
+from utils.stats_counter import contact_group_ids
+from config import CONTACTS_FILE, GROUPS_FILE, EXPORT_BATCH_SIZE
+
+CSV_FIELDS = ['id', 'first_name', 'last_name', 'username', 'phone', 'group_id', 'group_title', 'added_date']
+
+def _vcard_escape(value: Any) -> str:
+    return str(value or '').replace('\\', '\\\\').replace(',', '\\,').replace(';', '\\;').replace('\n', '\\n')
+
+class CsvWriter:
+    """Запись контактов в CSV с заголовком"""
+
+    def __init__(self, f: TextIO):
+        self.writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.writer.writerow(record)
+
+class JsonlWriter:
+    """Запись контактов в JSONL: одна запись на строку"""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+class VcardWriter:
+    """Запись контактов в vCard 3.0 для импорта в телефонную книгу"""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+
+    def write(self, record: Dict[str, Any]) -> None:
+        first_name = _vcard_escape(record.get('first_name'))
+        last_name = _vcard_escape(record.get('last_name'))
+        lines = [
+            'BEGIN:VCARD',
+            'VERSION:3.0',
+            f"N:{last_name};{first_name};;;",
+            f"FN:{f'{first_name} {last_name}'.strip() or _vcard_escape(record['id'])}"
+        ]
+        if record.get('phone'):
+            lines.append(f"TEL;TYPE=CELL:+{str(record['phone']).lstrip('+')}")
+        if record.get('username'):
+            lines.append(f"X-TELEGRAM:@{_vcard_escape(record['username'])}")
+        lines.append(f"NOTE:{_vcard_escape(record.get('group_title'))}")
+        lines.append('END:VCARD')
+        self.f.write('\r\n'.join(lines) + '\r\n')
+
+# Формат -> (класс записи, расширение файла)
+FORMATS = {
+    'csv': (CsvWriter, 'csv'),
+    'jsonl': (JsonlWriter, 'jsonl'),
+    'vcard': (VcardWriter, 'vcf')
+}
+
+def parse_date(value: str, end: bool = False) -> str:
+    """
+    Переводит дату ДД.ММ.ГГГГ в ISO строку для сравнения с added_date
+
+    Args:
+        value: Дата в формате ДД.ММ.ГГГГ
+        end: Вернуть начало следующего дня, чтобы дата входила в диапазон целиком
+    """
+    date = datetime.strptime(value, "%d.%m.%Y")
+    if end:
+        date += timedelta(days=1)
+    return date.isoformat()
+
+def parse_group_id(value: str) -> Optional[str]:
+    """
+    Переводит ID или username группы в ID, под которым она хранится
+
+    Принимает то же, что и /add_group: ID с префиксом -100 (или без него)
+    и username с @ или без. Группы хранятся по ID без префикса.
+
+    Returns:
+        ID группы или None, если группа с таким username не отслеживается
+    """
+    value = value.lstrip('@')
+    if value.lstrip('-').isdigit():
+        # Как в get_group_info: префикс -100 отрезается от строки
+        return value[4:] if value.startswith('-100') else value.lstrip('-')
+    username = value.casefold()
+    for group_id, group_data in store.load_json(GROUPS_FILE).items():
+        if (group_data.get('username') or '').casefold() == username:
+            return group_id
+    return None
+
+def iter_contact_batches(
+    admin_id: int,
+    group_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Перебирает контакты пачками в порядке добавления, применяя фильтры
+
+    Пачки берутся из индекса group_contacts, поэтому в памяти одновременно
+    находится не больше batch_size записей.
+    Генератор нужно продвигать в потоке событий: между пачками коллекция
+    может меняться.
+
+    Args:
+        admin_id: Только контакты из групп этого админа
+        group_id: Только контакты, относящиеся к этой группе (ID из parse_group_id)
+        date_from: Начало диапазона (ISO строка, включительно)
+        date_to: Конец диапазона (ISO строка, не включительно)
+        batch_size: Размер пачки
+    """
+    offset = 0
+    while True:
+        contacts = store.load_json(CONTACTS_FILE)
+        user_ids = group_contacts.admin_page(admin_id, offset, batch_size)
+        if not user_ids:
+            return
+        offset += len(user_ids)
+        batch = []
+        for user_id in user_ids:
+            record = contacts.get(user_id)
+            if record is None:
+                continue
+            if group_id is not None and group_id not in contact_group_ids(record):
+                continue
+            if date_from or date_to:
+                added = normalize_date(record.get('added_date')) or ''
+                if (date_from and added < date_from) or (date_to and added >= date_to):
+                    continue
+            batch.append(record)
+        if batch:
+            yield batch
+
+async def export_contacts(file_path: str, export_format: str, **filters: Any) -> int:
+    """
+    Выгружает контакты в файл и возвращает количество записей
+
+    Пачки выбираются в потоке событий, а форматирование и запись на диск
+    выполняются в отдельном потоке, поэтому выгрузка большой базы
+    не блокирует обработку новых сообщений.
+
+    Args:
+        file_path: Путь к файлу выгрузки
+        export_format: csv, jsonl или vcard
+        filters: Параметры iter_contact_batches
+    """
+    writer_class, _ = FORMATS[export_format]
+
+    def write_batch(writer: Any, batch: List[Dict[str, Any]]) -> None:
+        for record in batch:
+            writer.write(record)
+
+    count = 0
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = writer_class(f)
+        for batch in iter_contact_batches(**filters):
+            await asyncio.to_thread(write_batch, writer, batch)
+            count += len(batch)
+    return count
@@ -0,0 +1,395 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Any, Container, Iterable, List, Optional, Set, Tuple
+from utils.json_utils import store
+from utils.stats_counter import contact_group_ids
+from config import ADMINS_FILE, BLACKLIST_FILE, CONTACTS_FILE, SEARCH_SCAN_LIMIT
+
+class AdminIndex:
+    """
+    Обратный индекс админов: ID пользователя -> ID групп, где он админ
+
+    Подписан на admins.json в хранилище, поэтому обновляется при
+    добавлении админа и удалении группы без перечитывания файла.
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, Set[str]] = {}
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Перестраивает индекс по содержимому admins.json"""
+        self._groups = {}
+        for group_id, group_admins in data.items():
+            self._add(group_id, group_admins)
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает изменение списка админов одной группы"""
+        for user_id in old_value or ():
+            groups = self._groups.get(user_id)
+            if groups is not None:
+                groups.discard(key)
+                if not groups:
+                    del self._groups[user_id]
+        self._add(key, new_value)
+
+    def _add(self, group_id: str, group_admins: Optional[Dict[str, Any]]) -> None:
+        for user_id in group_admins or ():
+            self._groups.setdefault(user_id, set()).add(group_id)
+
+    def is_admin(self, user_id: Any) -> bool:
+        """Проверяет, является ли пользователь админом хотя бы одной группы"""
+        return str(user_id) in self._groups
+
+    def groups_of(self, user_id: Any) -> Set[str]:
+        """ID групп, где пользователь является админом"""
+        return self._groups.get(str(user_id), set())
+
+class BlacklistIndex:
+    """
+    ID пользователей из черного списка в виде множества целых чисел
+
+    Проверяется первой стадией обработки сообщений прямо по sender_id
+    из события, без перевода в строку и обращения к коллекции.
+    Обновляется при добавлении в черный список и удалении из него.
+    """
+
+    def __init__(self):
+        self._ids: Set[int] = set()
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Перестраивает индекс по содержимому blacklist.json"""
+        self._ids = {int(user_id) for user_id in data}
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает добавление или удаление пользователя"""
+        if new_value is None:
+            self._ids.discard(int(key))
+        else:
+            self._ids.add(int(key))
+
+    def __contains__(self, user_id: Any) -> bool:
+        return int(user_id) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+class UsernameIndex:
+    """
+    Индекс username -> ID пользователя для одной коллекции
+
+    Username хранятся в casefold, поэтому поиск @UserName и @username
+    дает одного пользователя за O(1) без перебора записей.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+
+    @staticmethod
+    def normalize(username: Optional[str]) -> str:
+        """Приводит username к виду для поиска: без @ и без учета регистра"""
+        return (username or '').lstrip('@').casefold()
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Перестраивает индекс по содержимому коллекции"""
+        self._ids = {}
+        for user_id, record in data.items():
+            self._add(user_id, record)
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает добавление, удаление или смену username пользователя"""
+        if old_value is not None:
+            username = self.normalize(old_value.get('username'))
+            # Username мог перейти к другому пользователю, его запись не трогаем
+            if username and self._ids.get(username) == key:
+                del self._ids[username]
+        self._add(key, new_value)
+
+    def _add(self, user_id: str, record: Optional[Dict[str, Any]]) -> None:
+        if record is not None:
+            username = self.normalize(record.get('username'))
+            if username:
+                self._ids[username] = user_id
+
+    def get(self, username: Optional[str]) -> Optional[str]:
+        """ID пользователя по username или None"""
+        return self._ids.get(self.normalize(username))
+
+class GroupContactsIndex:
+    """
+    Контакты по группам и по админам групп
+
+    group_id -> ID контактов, замеченных в группе, и ID админа -> ID контактов
+    из всех его групп (со счетчиком групп, через которые контакт виден).
+    Подписан на contacts.json и admins.json, поэтому удаление группы вместе
+    с ее админами сразу убирает ее контакты из выдачи этих админов.
+    Словари сохраняют порядок добавления, количество берется через len за O(1).
+    Для постраничного вывода у админа хранится список его контактов: новые
+    контакты дописываются в конец, а после удаления список строится заново
+    при следующем запросе страницы.
+    """
+
+    def __init__(self):
+        self._by_group: Dict[str, Dict[str, None]] = {}
+        # ID группы -> ID ее админов
+        self._admins: Dict[str, Set[str]] = {}
+        self._by_admin: Dict[str, Dict[str, int]] = {}
+        # ID админа -> ID его контактов по порядку, для чтения страницы срезом
+        self._pages: Dict[str, List[str]] = {}
+        self._contacts: Dict[str, Any] = {}
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Перестраивает индекс при загрузке контактов или админов"""
+        if file_path == CONTACTS_FILE:
+            self._contacts = data
+            self._by_group = {}
+            for user_id, contact in data.items():
+                for group_id in contact_group_ids(contact):
+                    self._by_group.setdefault(group_id, {})[user_id] = None
+        else:
+            self._admins = {group_id: set(group_admins) for group_id, group_admins in data.items()}
+
+        # Порядок контактов у админа - порядок их добавления в базу
+        self._by_admin = {}
+        self._pages = {}
+        for user_id, contact in self._contacts.items():
+            for group_id in contact_group_ids(contact):
+                for admin_id in self._admins.get(group_id, ()):
+                    self._link(admin_id, user_id, 1)
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает изменение контакта или списка админов группы"""
+        if file_path == CONTACTS_FILE:
+            old_groups = set(contact_group_ids(old_value))
+            new_groups = set(contact_group_ids(new_value))
+            for group_id in old_groups - new_groups:
+                self._by_group.get(group_id, {}).pop(key, None)
+                for admin_id in self._admins.get(group_id, ()):
+                    self._link(admin_id, key, -1)
+            for group_id in new_groups - old_groups:
+                self._by_group.setdefault(group_id, {})[key] = None
+                for admin_id in self._admins.get(group_id, ()):
+                    self._link(admin_id, key, 1)
+            return
+
+        old_admins = set(old_value or ())
+        new_admins = set(new_value or ())
+        if new_admins:
+            self._admins[key] = new_admins
+        else:
+            self._admins.pop(key, None)
+        contacts = self._by_group.get(key, {})
+        for admin_id in old_admins - new_admins:
+            for user_id in contacts:
+                self._link(admin_id, user_id, -1)
+        for admin_id in new_admins - old_admins:
+            for user_id in contacts:
+                self._link(admin_id, user_id, 1)
+
+    def _link(self, admin_id: str, user_id: str, delta: int) -> None:
+        contacts = self._by_admin.setdefault(admin_id, {})
+        count = contacts.get(user_id, 0) + delta
+        if count > 0:
+            if user_id not in contacts and admin_id in self._pages:
+                self._pages[admin_id].append(user_id)
+            contacts[user_id] = count
+        else:
+            contacts.pop(user_id, None)
+            self._pages.pop(admin_id, None)
+            if not contacts:
+                del self._by_admin[admin_id]
+
+    def group_count(self, group_id: Any) -> int:
+        """Количество контактов группы"""
+        return len(self._by_group.get(str(group_id), ()))
+
+    def admin_count(self, admin_id: Any) -> int:
+        """Количество контактов во всех группах админа"""
+        return len(self._by_admin.get(str(admin_id), ()))
+
+    def admin_contacts(self, admin_id: Any) -> Dict[str, int]:
+        """ID контактов во всех группах админа (только для проверки вхождения)"""
+        return self._by_admin.get(str(admin_id), {})
+
+    def admin_page(self, admin_id: Any, offset: int, limit: int) -> List[str]:
+        """ID контактов админа с позиции offset, не больше limit"""
+        admin_id = str(admin_id)
+        page = self._pages.get(admin_id)
+        if page is None:
+            page = self._pages[admin_id] = list(self._by_admin.get(admin_id, ()))
+        return page[offset:offset + limit]
+
+def _trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+class ContactSearchIndex:
+    """
+    Поисковый индекс контактов по имени, фамилии, username и телефону
+
+    Слова записей хранятся в casefold в отсортированном списке для поиска
+    по префиксу (бинарный поиск) и в триграммном индексе для поиска
+    подстроки: кандидаты - пересечение множеств триграмм запроса, затем
+    совпадение проверяется по словам кандидата. Результаты ранжируются:
+    точное совпадение слова, затем префикс, затем подстрока.
+    """
+
+    def __init__(self, scan_limit: int = SEARCH_SCAN_LIMIT):
+        self.scan_limit = scan_limit
+        # ID контакта -> слова записи
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        # Отсортированные пары (слово, ID контакта)
+        self._sorted: List[Tuple[str, str]] = []
+        # Триграмма -> ID контактов, в словах которых она встречается
+        self._trigrams: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def normalize(word: str) -> str:
+        """Приводит слово записи или запроса к виду для поиска"""
+        word = word.casefold().lstrip('@')
+        # Телефон ищется без + в начале
+        if word[1:].isdigit() and word[0] == '+':
+            word = word[1:]
+        return word
+
+    @classmethod
+    def words_of(cls, record: Dict[str, Any]) -> Tuple[str, ...]:
+        """Слова записи, по которым ищется контакт"""
+        text = ' '.join(
+            str(record.get(field) or '')
+            for field in ('first_name', 'last_name', 'username', 'phone')
+        )
+        return tuple(dict.fromkeys(word for word in map(cls.normalize, text.split()) if word))
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """
+        Строит индекс по содержимому contacts.json
+
+        Вызывается при открытии хранилища, до запуска обработчиков, поэтому
+        первый поиск не ждет построения индекса и не блокирует цикл событий.
+        """
+        self._words = {}
+        self._sorted = []
+        trigrams: Dict[str, Set[str]] = defaultdict(set)
+        for user_id, record in data.items():
+            words = self.words_of(record)
+            self._words[user_id] = words
+            for word in words:
+                self._sorted.append((word, user_id))
+                for trigram in _trigrams(word):
+                    trigrams[trigram].add(user_id)
+        self._sorted.sort()
+        self._trigrams = dict(trigrams)
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает добавление, удаление или изменение контакта"""
+        old_words = self._words.pop(key, ())
+        new_words = self.words_of(new_value) if new_value is not None else ()
+        if new_value is not None:
+            self._words[key] = new_words
+        if old_words == new_words:
+            return
+
+        for word in old_words:
+            i = bisect_left(self._sorted, (word, key))
+            if i < len(self._sorted) and self._sorted[i] == (word, key):
+                del self._sorted[i]
+        for trigram in set().union(*map(_trigrams, old_words)):
+            ids = self._trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del self._trigrams[trigram]
+
+        for word in new_words:
+            insort(self._sorted, (word, key))
+            for trigram in _trigrams(word):
+                self._trigrams.setdefault(trigram, set()).add(key)
+
+    def _by_prefix(self, word: str, among: Optional[Container[str]]) -> Set[str]:
+        ids = set()
+        for i in range(bisect_left(self._sorted, (word, '')), len(self._sorted)):
+            token, user_id = self._sorted[i]
+            if not token.startswith(word) or len(ids) >= self.scan_limit:
+                break
+            # Лимит просмотра считаем только по подходящим контактам
+            if among is None or user_id in among:
+                ids.add(user_id)
+        return ids
+
+    def _by_substring(self, word: str) -> Set[str]:
+        sets = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(word)), key=len)
+        if not sets or not sets[0]:
+            return set()
+        ids = set(sets[0])
+        for other in sets[1:]:
+            ids &= other
+            if not ids:
+                break
+        return ids
+
+    @staticmethod
+    def _score(word: str, words: Iterable[str]) -> int:
+        score = 0
+        for token in words:
+            if token == word:
+                return 3
+            if token.startswith(word):
+                score = 2
+            elif score < 1 and word in token:
+                score = 1
+        return score
+
+    def search(self, query: str, limit: int, among: Optional[Container[str]] = None) -> List[str]:
+        """
+        Ищет контакты, у которых каждое слово запроса совпадает со словом записи
+
+        Args:
+            query: Строка поиска
+            limit: Максимальное количество результатов
+            among: Искать только среди этих ID контактов (например, контактов админа)
+
+        Returns:
+            ID контактов, начиная с лучших совпадений
+        """
+        words = [self.normalize(word) for word in query.split()]
+        words = [word for word in words if word]
+        if not words:
+            return []
+
+        # Кандидатов берем по самому длинному слову: у него меньше совпадений
+        first = max(words, key=len)
+        candidates = self._by_prefix(first, among)
+        if len(first) >= 3:
+            candidates |= self._by_substring(first)
+
+        ranked = []
+        for user_id in candidates:
+            if among is not None and user_id not in among:
+                continue
+            record_words = self._words.get(user_id, ())
+            scores = [self._score(word, record_words) for word in words]
+            if all(scores):
+                ranked.append((-sum(scores), record_words, user_id))
+        ranked.sort()
+        return [user_id for _, _, user_id in ranked[:limit]]
+
+# Индекс админов, обновляемый вместе с admins.json
+admin_index = AdminIndex()
+store.add_listener(admin_index, ADMINS_FILE)
+
+# Черный список для проверки до любых запросов к Telegram
+blacklist_ids = BlacklistIndex()
+store.add_listener(blacklist_ids, BLACKLIST_FILE)
+
+# Поиск по username в контактах и черном списке
+contact_usernames = UsernameIndex()
+store.add_listener(contact_usernames, CONTACTS_FILE)
+blacklist_usernames = UsernameIndex()
+store.add_listener(blacklist_usernames, BLACKLIST_FILE)
+
+# Контакты групп и админов для выдачи только по своим группам
+group_contacts = GroupContactsIndex()
+store.add_listener(group_contacts, CONTACTS_FILE, ADMINS_FILE)
+
+# Поиск контактов командой /find и в inline режиме
+contact_search = ContactSearchIndex()
+store.add_listener(contact_search, CONTACTS_FILE)
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable, Hashable
+from telethon.utils import resolve_id
+from utils.json_utils import store, attribute_contact
+from utils.negative_cache import negative_cache
+from utils.indexes import blacklist_ids
+from utils.contact_scheduler import ContactAddScheduler
+from utils.logger import logger
+from config import GROUPS_FILE, CONTACTS_FILE, INGEST_DEDUP_SIZE
+
+class IngestPipeline:
+    """
+    Единый путь обработки сообщений из отслеживаемых групп
+
+    В него пишут оба источника: обработчик Telethon и хэндлер aiogram.
+    Стадии выполняются по порядку, и каждая может остановить обработку:
+
+    1. blacklist - отправитель не в черном списке (проверка по множеству ID)
+    2. filter - сообщение из отслеживаемой группы от пользователя
+    3. dedup - это сообщение еще не обрабатывалось другим источником
+    4. known - отправитель еще не контакт (известный контакт только
+       относится к группе), не в очереди и не в кэше неудач
+    5. resolve - данные отправителя, единственная стадия с запросами к Telegram
+    6. add - заявка в очередь ContactAddScheduler, который добавляет контакт,
+       сохраняет его и через on_added уведомляет админов
+
+    Первые четыре стадии работают только с данными в памяти.
+    """
+
+    def __init__(self, scheduler: ContactAddScheduler, dedup_size: int = INGEST_DEDUP_SIZE):
+        self.scheduler = scheduler
+        self.dedup_size = dedup_size
+        # (ID группы, ID сообщения) последних обработанных сообщений
+        self._seen: OrderedDict = OrderedDict()
+
+    def blacklisted(self, sender_id: Optional[int]) -> bool:
+        """Проверяет отправителя по черному списку"""
+        return sender_id is not None and sender_id in blacklist_ids
+
+    def filter(self, chat_id: Optional[int], sender_id: Optional[int]) -> Optional[str]:
+        """
+        Проверяет, что сообщение пришло из отслеживаемой группы от пользователя
+
+        Returns:
+            ID группы без префикса -100 или None, если сообщение не нужно
+        """
+        # Сообщения от имени каналов и анонимных админов не дают контактов
+        if chat_id is None or sender_id is None or sender_id <= 0:
+            return None
+        group_id, _ = resolve_id(chat_id)
+        group_id = str(group_id)
+        return group_id if group_id in store.load_json(GROUPS_FILE) else None
+
+    def dedup(self, key: Hashable) -> bool:
+        """Запоминает сообщение и возвращает False, если оно уже обрабатывалось"""
+        if key in self._seen:
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def known(self, group_id: str, user_id: str) -> bool:
+        """Проверяет, что отправитель уже известен и добавлять его не нужно"""
+        if user_id in store.load_json(CONTACTS_FILE):
+            # Известный контакт, написавший в другой отслеживаемой группе, относим и к ней
+            attribute_contact(CONTACTS_FILE, user_id, group_id)
+            return True
+        # Уже в очереди или недавно не удалось добавить
+        return self.scheduler.is_pending(user_id) or negative_cache.is_blocked(user_id)
+
+    async def process(
+        self,
+        chat_id: Optional[int],
+        message_id: int,
+        sender_id: Optional[int],
+        resolve: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> bool:
+        """
+        Проводит сообщение через все стадии
+
+        Args:
+            chat_id: ID чата (с префиксом -100 для супергрупп)
+            message_id: ID сообщения в чате
+            sender_id: ID отправителя
+            resolve: Получает данные отправителя для добавления (group_id заполнит pipeline)
+
+        Returns:
+            True если отправитель поставлен в очередь на добавление
+        """
+        if self.blacklisted(sender_id):
+            return False
+        group_id = self.filter(chat_id, sender_id)
+        if group_id is None:
+            return False
+        if not self.dedup((group_id, message_id)):
+            return False
+        user_id = str(sender_id)
+        if self.known(group_id, user_id):
+            return False
+
+        user_data = await resolve()
+        if user_data is None:
+            return False
+
+        # Пока загружались данные, пользователь мог попасть в базу, очередь или черный список
+        if self.blacklisted(sender_id) or self.known(group_id, user_id):
+            return False
+        if self.scheduler.submit({**user_data, 'group_id': group_id}):
+            logger.debug(f"Пользователь {user_id} из группы {group_id} поставлен в очередь")
+            return True
+        return False
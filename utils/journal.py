@@ -0,0 +1,150 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+from utils.logger import logger
+
+class Journal:
+    """
+    Append-only журнал изменений коллекций в формате JSONL
+
+    Каждая строка - одно изменение записи: {"op": "put" | "del", "file", "key", "value", "ts"}.
+    Снимок коллекции хранится в ее JSON файле, а журнал содержит изменения,
+    сделанные после последнего снимка. При запуске снимок загружается
+    и поверх него проигрываются записи журнала.
+    """
+
+    def __init__(self, path: str, collections: Iterable[str]):
+        self.path = path
+        self.collections = set(collections)
+        # Количество записей в журнале с момента последнего снимка
+        self.records = 0
+        self._file = None
+
+    @staticmethod
+    def has_records(path: str) -> bool:
+        """Проверяет, есть ли в журнале изменения, еще не сжатые в снимки"""
+        return Path(path).exists() and Path(path).stat().st_size > 0
+
+    def _open(self):
+        """Открывает файл журнала на дозапись"""
+        if self._file is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def replay(self, data: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Применяет записи журнала к загруженным снимкам коллекций
+
+        Обрезанной после сбоя может быть только последняя строка: она
+        пропускается и отрезается от файла, чтобы следующая запись
+        не склеилась с ней.
+
+        Args:
+            data: Путь коллекции -> словарь с ее данными
+
+        Returns:
+            Количество примененных записей
+
+        Raises:
+            CorruptedFileError: Поврежденная строка в середине журнала.
+                Пропустить ее значило бы молча потерять изменения
+        """
+        applied = 0
+        # Конец последней целой строки и номер непрочитанной строки после нее
+        valid_end = 0
+        torn_line = None
+        try:
+            with open(self.path, 'rb') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        if torn_line is None:
+                            valid_end += len(line)
+                        continue
+                    if torn_line is not None:
+                        from utils.json_utils import CorruptedFileError
+
+                        logger.error(f"Поврежденная запись журнала {self.path}:{torn_line}")
+                        raise CorruptedFileError(
+                            f"Журнал {self.path} поврежден в строке {torn_line}, за ней есть другие записи"
+                        )
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        torn_line = line_number
+                        continue
+                    valid_end += len(line)
+                    collection = data.get(record.get('file'))
+                    if collection is None:
+                        continue
+                    if record.get('op') == 'del':
+                        collection.pop(record['key'], None)
+                    else:
+                        collection[record['key']] = record['value']
+                    applied += 1
+        except FileNotFoundError:
+            pass
+        if torn_line is not None:
+            # Обрезанная последняя строка - результат сбоя во время записи
+            logger.warning(f"Отброшена обрезанная последняя запись журнала {self.path}:{torn_line}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+        elif valid_end and not self._ends_with_newline():
+            # Последняя запись цела, но сбой случился до перевода строки
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+        self.records = applied
+        if applied:
+            logger.info(f"Из журнала {self.path} восстановлено {applied} изменений")
+        return applied
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def append(self, file_path: str, changes: Dict[str, Optional[Any]], sync: bool = True) -> None:
+        """
+        Дописывает изменения коллекции в конец журнала
+
+        Args:
+            file_path: Путь коллекции из config
+            changes: Ключ записи -> новое значение или None для удаления
+            sync: Сразу сбросить журнал на диск; при False нужно вызвать sync()
+                после последней записи пачки
+        """
+        if not changes:
+            return
+        timestamp = datetime.now().isoformat()
+        lines = []
+        for key, value in changes.items():
+            record = {'op': 'del' if value is None else 'put', 'file': file_path, 'key': key, 'ts': timestamp}
+            if value is not None:
+                record['value'] = value
+            lines.append(json.dumps(record, ensure_ascii=False))
+        f = self._open()
+        f.write('\n'.join(lines) + '\n')
+        self.records += len(lines)
+        if sync:
+            self.sync()
+
+    def sync(self) -> None:
+        """Сбрасывает дописанные записи журнала на диск"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self) -> None:
+        """Очищает журнал после записи снимков коллекций"""
+        self.close()
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+        self.records = 0
+
+    def close(self) -> None:
+        """Закрывает файл журнала"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
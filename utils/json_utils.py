@@ -1,119 +1,639 @@
-import json
+import asyncio
 import os
 from pathlib import Path
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 from utils.logger import logger
-from config import BLACKLIST_FILE
+from config import (
+    BLACKLIST_FILE, CONTACTS_FILE, GROUPS_FILE,
+    FLUSH_INTERVAL, GROUP_COMMIT_WINDOW, STORAGE_BACKEND, SQLITE_FILE,
+    JOURNAL_ENABLED, JOURNAL_FILE, JOURNAL_COMPACT_THRESHOLD, SHARDED_FILES
+)
+from utils.journal import Journal
+from utils.sqlite_storage import SQLiteStorage
+from utils.stats_counter import StatsCounter, contact_group_ids
+from utils.shards import ShardedFile, manifest_of
+from utils.serializers import DecodeError, decode, encode, format_of, parse_format
 
 def init_json_files(default_files: Dict[str, Any]) -> None:
-    """Инициализирует JSON файлы с дефолтными значениями"""
+    """Инициализирует файлы данных с дефолтными значениями"""
     for file_path, default_data in default_files.items():
         path = Path(file_path)
-        if not path.exists():
+        # Коллекция в шардах не создается заново в виде одного файла
+        if not path.exists() and not manifest_of(file_path).exists():
             path.parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(default_data, f, ensure_ascii=False, indent=4)
+            save_json(file_path, default_data)
             logger.info(f"Создан файл {file_path} с дефолтными значениями")
 
+class CorruptedFileError(ValueError):
+    """Файл данных существует, но не читается: его нельзя считать пустым"""
+
 def load_json(file_path: str) -> Dict[str, Any]:
-    """Загружает данные из JSON файла"""
+    """
+    Загружает данные из файла
+
+    Формат (JSON, msgpack, сжатие) определяется по содержимому,
+    поэтому файл читается независимо от текущего DATA_FORMAT.
+
+    Raises:
+        CorruptedFileError: Файл поврежден. Пустой результат в этом случае
+            означал бы потерю базы, поэтому загрузка прерывается
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(file_path, 'rb') as f:
+            return decode(f.read())
     except FileNotFoundError:
         logger.error(f"Файл {file_path} не найден")
         return {}
-    except json.JSONDecodeError:
-        logger.error(f"Ошибка при чтении файла {file_path}")
-        return {}
+    except DecodeError as e:
+        logger.error(f"Ошибка при чтении файла {file_path}: {e}")
+        raise CorruptedFileError(f"Файл {file_path} поврежден: {e}") from e
+
+def save_json(file_path: str, data: Dict[str, Any], data_format: Optional[str] = None) -> bool:
+    """
+    Атомарно сохраняет данные в файл
 
-def save_json(file_path: str, data: Dict[str, Any]) -> bool:
-    """Сохраняет данные в JSON файл"""
+    Данные пишутся во временный файл рядом с целевым, сбрасываются на диск
+    и подменяют его через rename. При сбое на диске остается либо старая,
+    либо новая версия файла, но не обрезанная.
+
+    Args:
+        data_format: Формат из utils.serializers, по умолчанию формат коллекции из config
+    """
+    tmp_path = f"{file_path}.tmp"
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        raw = encode(data, data_format or format_of(file_path))
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
         return True
     except Exception as e:
         logger.error(f"Ошибка при сохранении файла {file_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         return False
 
+def sharded_files(file_paths: Iterable[str]) -> Dict[str, ShardedFile]:
+    """
+    Коллекции, которые хранятся в шардах: из SHARDED_FILES и уже разложенные
+
+    Коллекция с манифестом читается из шардов, даже если ее убрали из
+    SHARDED_FILES: исходный файл после разбиения устарел и переименован.
+    """
+    sharded = {}
+    for file_path in file_paths:
+        shards = SHARDED_FILES.get(file_path)
+        if shards is None:
+            if not manifest_of(file_path).exists():
+                continue
+            logger.warning(
+                f"{file_path} хранится в шардах, но не указан в SHARDED_FILES: "
+                f"используется количество шардов из манифеста"
+            )
+            shards = 1
+        # Шарды пишутся в формате своей коллекции
+        save = partial(save_json, data_format=format_of(file_path))
+        sharded[file_path] = ShardedFile(file_path, shards, load_json, save)
+    return sharded
+
+def read_json_collections(file_paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Читает коллекции из JSON файлов и шардов для переноса в SQLite
+
+    Файлы журналируемых коллекций - только снимки, поэтому перенос
+    возможен лишь после сжатия журнала.
+
+    Raises:
+        RuntimeError: Журнал не пуст, и часть изменений есть только в нем
+    """
+    if Journal.has_records(JOURNAL_FILE):
+        raise RuntimeError(
+            f"Журнал {JOURNAL_FILE} не пуст: запустите бота с JSON хранилищем и остановите его, "
+            f"чтобы сжать журнал, затем повторите перенос"
+        )
+    file_paths = list(file_paths)
+    sharded = sharded_files(file_paths)
+    return {
+        file_path: sharded[file_path].load()
+        if file_path in sharded and sharded[file_path].exists() else load_json(file_path)
+        for file_path in file_paths
+    }
+
+# Коллекция, перезапись целиком, построчные изменения, снимок для записи
+PendingWrite = Tuple[str, bool, Dict[str, Any], Optional[Dict[str, Any]]]
+
+class Transaction:
+    """
+    Изменения нескольких коллекций, применяемые вместе
+
+    Создается через DataStore.transaction. Чтения видят данные хранилища
+    с учетом еще не примененных изменений транзакции, а сами изменения
+    попадают в хранилище одним commit при выходе из блока. Если блок
+    завершился ошибкой, изменения отбрасываются.
+    """
+
+    def __init__(self, store: 'DataStore', file_paths: Iterable[str]):
+        self.store = store
+        self.file_paths = set(file_paths)
+        # Коллекция -> ключ -> новое значение или None для удаления
+        self._changes: Dict[str, Dict[str, Optional[Any]]] = {}
+
+    def _check(self, file_path: str) -> None:
+        if file_path not in self.file_paths:
+            raise ValueError(f"Коллекция {file_path} не заблокирована транзакцией")
+
+    def get(self, file_path: str, key: str, default: Any = None) -> Any:
+        """Возвращает запись с учетом изменений транзакции"""
+        self._check(file_path)
+        changes = self._changes.get(file_path, {})
+        if key in changes:
+            value = changes[key]
+            return default if value is None else value
+        return self.store.load_json(file_path).get(key, default)
+
+    def put(self, file_path: str, key: str, value: Any) -> None:
+        """Записывает запись при commit"""
+        self._check(file_path)
+        self._changes.setdefault(file_path, {})[key] = value
+
+    def pop(self, file_path: str, key: str, default: Any = None) -> Any:
+        """Удаляет запись при commit и возвращает ее текущее значение"""
+        value = self.get(file_path, key)
+        if value is None:
+            return default
+        self._changes.setdefault(file_path, {})[key] = None
+        return value
+
+    def commit(self) -> None:
+        """Применяет изменения к хранилищу, без await между ними"""
+        for file_path, changes in self._changes.items():
+            for key, value in changes.items():
+                if value is None:
+                    self.store.pop(file_path, key)
+                else:
+                    self.store.put(file_path, key, value)
+        self._changes = {}
+
+class DataStore:
+    """
+    Хранилище данных в памяти с отложенной записью на диск
+
+    Каждая коллекция (контакты, группы, черный список, админы, статистика)
+    читается с диска один раз, дальше все чтения идут из памяти.
+    Измененные коллекции помечаются как "грязные" и сбрасываются на диск
+    фоновой задачей раз в flush_interval секунд и при остановке бота.
+    Сама запись выполняется в отдельном потоке хранилища (flush_async).
+
+    При STORAGE_BACKEND = 'sqlite' контакты, группы, черный список и админы
+    хранятся в базе SQLite, и на диск записываются только измененные строки.
+    Для JSON файлов изменения контактов, групп и черного списка дописываются
+    в журнал, а сами файлы перезаписываются только при его сжатии.
+    Коллекции из SHARDED_FILES хранятся в нескольких файлах (ShardedFile),
+    и перезаписываются только шарды с изменениями.
+
+    Подписчики (счетчики, индексы) регистрируются через add_listener и получают
+    reset(file_path, data) при загрузке или замене коллекции целиком и
+    update(file_path, key, old_value, new_value) при изменении одной записи.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, commit_window: float = GROUP_COMMIT_WINDOW):
+        self.flush_interval = flush_interval
+        self.backend: Optional[SQLiteStorage] = None
+        self._data: Dict[str, Dict[str, Any]] = {}
+        # Коллекции, которые нужно перезаписать целиком
+        self._dirty: Set[str] = set()
+        # Построчные изменения: ключ -> новое значение или None для удаления
+        self._changes: Dict[str, Dict[str, Optional[Any]]] = {}
+        self.journal: Optional[Journal] = None
+        self._listeners: Dict[str, List[Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # Вся запись на диск идет в одном потоке, чтобы не блокировать цикл событий
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+        self._flush_lock = asyncio.Lock()
+        self.commit_window = commit_window
+        # Общая запись, к которой присоединяются вызовы flush_async в пределах окна
+        self._commit: Optional[asyncio.Future] = None
+        self._compact_requested = False
+        self._opened = False
+        # Блокировки коллекций для транзакций
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Коллекции, хранящиеся в нескольких файлах
+        self._shards: Dict[str, ShardedFile] = {}
+
+    def open(self, default_files: Dict[str, Any]) -> None:
+        """Создает недостающие файлы и загружает все коллекции в память"""
+        # Неизвестный формат или отсутствующая библиотека - ошибка при запуске, а не при записи
+        for file_path in default_files:
+            parse_format(format_of(file_path))
+        init_json_files(default_files)
+        if STORAGE_BACKEND == 'sqlite':
+            self.backend = SQLiteStorage(SQLITE_FILE)
+            if self.backend.is_empty():
+                # Разовый перенос данных из JSON файлов при первом запуске
+                self.backend.import_collections(read_json_collections(default_files))
+        else:
+            self._shards = sharded_files(set(default_files) | set(SHARDED_FILES))
+            for file_path, sharded in self._shards.items():
+                if sharded.exists():
+                    # Переименование могло не случиться, если запись прервалась после манифеста
+                    sharded.retire_single_file()
+                self.add_listener(sharded, file_path)
+            if JOURNAL_ENABLED:
+                self.journal = Journal(JOURNAL_FILE, (CONTACTS_FILE, BLACKLIST_FILE, GROUPS_FILE))
+        for file_path in default_files:
+            self._data[file_path] = self._load(file_path)
+        if self.journal is not None:
+            # Снимки загружены, догоняем их изменениями из журнала
+            for file_path in self.journal.collections:
+                if file_path not in self._data:
+                    self._data[file_path] = self._load(file_path)
+            self.journal.replay(self._data)
+        for file_path, data in self._data.items():
+            self._reset_listeners(file_path, data)
+        for sharded in self._shards.values():
+            # Шарды на диске совпадают с памятью, если журнал не добавил изменений.
+            # Коллекция из одного файла будет разложена по шардам при первой записи
+            if sharded.exists() and not (self.journal is not None and self.journal.records):
+                sharded.dirty.clear()
+        self._opened = True
+        logger.info(f"Хранилище загружено: {len(self._data)} коллекций")
+
+    def _manages(self, file_path: str) -> bool:
+        """Проверяет, хранится ли коллекция в базе SQLite"""
+        return self.backend is not None and self.backend.manages(file_path)
+
+    def _load(self, file_path: str) -> Dict[str, Any]:
+        """Читает коллекцию из постоянного хранилища"""
+        if self._manages(file_path):
+            return self.backend.load(file_path)
+        if file_path in self._shards and self._shards[file_path].exists():
+            return self._shards[file_path].load()
+        return load_json(file_path)
+
+    def add_listener(self, listener: Any, *file_paths: str) -> None:
+        """Подписывает счетчик или индекс на изменения коллекций"""
+        for file_path in file_paths:
+            self._listeners.setdefault(file_path, []).append(listener)
+            if file_path in self._data:
+                listener.reset(file_path, self._data[file_path])
+
+    def _reset_listeners(self, file_path: str, data: Dict[str, Any]) -> None:
+        for listener in self._listeners.get(file_path, ()):
+            listener.reset(file_path, data)
+
+    def _update_listeners(self, file_path: str, key: str, old_value: Any, new_value: Any) -> None:
+        for listener in self._listeners.get(file_path, ()):
+            listener.update(file_path, key, old_value, new_value)
+
+    def load_json(self, file_path: str) -> Dict[str, Any]:
+        """Возвращает коллекцию из памяти, при первом обращении читает ее с диска"""
+        data = self._data.get(file_path)
+        if data is None:
+            data = self._data[file_path] = self._load(file_path)
+            self._reset_listeners(file_path, data)
+        return data
+
+    def save_json(self, file_path: str, data: Dict[str, Any]) -> bool:
+        """Заменяет коллекцию целиком и планирует ее запись на диск"""
+        self._data[file_path] = data
+        self._dirty.add(file_path)
+        self._reset_listeners(file_path, data)
+        return True
+
+    def put(self, file_path: str, key: str, value: Any) -> None:
+        """Записывает одну запись коллекции"""
+        data = self.load_json(file_path)
+        old_value = data.get(key)
+        data[key] = value
+        self._changes.setdefault(file_path, {})[key] = value
+        self._update_listeners(file_path, key, old_value, value)
+
+    def pop(self, file_path: str, key: str, default: Any = None) -> Any:
+        """Удаляет запись из коллекции и возвращает ее"""
+        data = self.load_json(file_path)
+        if key not in data:
+            return default
+        self._changes.setdefault(file_path, {})[key] = None
+        old_value = data.pop(key)
+        self._update_listeners(file_path, key, old_value, None)
+        return old_value
+
+    @asynccontextmanager
+    async def transaction(self, *file_paths: str, durable: bool = False) -> AsyncIterator[Transaction]:
+        """
+        Блокирует коллекции на время чтения-изменения-записи
+
+        Блокировки берутся в порядке сортировки путей, поэтому транзакции
+        с пересекающимися наборами коллекций не могут заблокировать друг друга.
+        Использовать, когда между чтением и записью есть await.
+
+        Args:
+            file_paths: Коллекции, которые читаются и изменяются в транзакции
+            durable: Дождаться записи изменений на диск перед выходом
+        """
+        locks = [self._locks.setdefault(file_path, asyncio.Lock()) for file_path in sorted(set(file_paths))]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            transaction = Transaction(self, file_paths)
+            yield transaction
+            transaction.commit()
+            if durable:
+                await self.flush_async()
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _journaled(self, file_path: str) -> bool:
+        """Проверяет, пишутся ли изменения коллекции в журнал"""
+        return self.journal is not None and file_path in self.journal.collections
+
+    def _collect(self, compact: bool) -> Tuple[List[PendingWrite], Optional[Dict[str, Dict[str, Any]]]]:
+        """
+        Забирает накопленные изменения для записи в потоке хранилища
+
+        Записи коллекций не изменяются на месте (меняются целиком через put),
+        поэтому потоку записи достаточно поверхностной копии словаря.
+
+        Returns:
+            Список (коллекция, перезапись целиком, изменения, снимок) и снимки
+            журналируемых коллекций, если журнал нужно сжать
+        """
+        batch = []
+        for file_path in self._dirty | set(self._changes):
+            rewrite = file_path in self._dirty
+            changes = self._changes.pop(file_path, {})
+            self._dirty.discard(file_path)
+            snapshot = None
+            if self._journaled(file_path):
+                if rewrite:
+                    # Коллекция заменена целиком, журнал для нее больше не годится
+                    compact = True
+            elif file_path in self._shards:
+                snapshot = self._shards[file_path].snapshot(self._data[file_path])
+            elif rewrite or not self._manages(file_path):
+                snapshot = dict(self._data[file_path])
+            batch.append((file_path, rewrite, changes, snapshot))
+
+        snapshots = None
+        if self.journal is not None and (compact or self.journal.records >= JOURNAL_COMPACT_THRESHOLD):
+            snapshots = {
+                file_path: self._shards[file_path].snapshot(self._data[file_path])
+                if file_path in self._shards else dict(self._data[file_path])
+                for file_path in self.journal.collections if file_path in self._data
+            }
+        return batch, snapshots
+
+    def _write(
+        self,
+        batch: List[PendingWrite],
+        snapshots: Optional[Dict[str, Dict[str, Any]]]
+    ) -> List[Tuple[str, bool, Dict[str, Any]]]:
+        """
+        Записывает изменения на диск, выполняется в потоке хранилища
+
+        Returns:
+            Изменения, которые записать не удалось
+        """
+        failed = []
+        for file_path, rewrite, changes, snapshot in batch:
+            try:
+                if self._journaled(file_path):
+                    # fsync журнала делается один раз на всю пачку
+                    self.journal.append(file_path, changes, sync=False)
+                    saved = True
+                elif file_path in self._shards:
+                    saved = self._shards[file_path].write(snapshot)
+                elif not self._manages(file_path):
+                    saved = save_json(file_path, snapshot)
+                elif rewrite:
+                    self.backend.replace(file_path, snapshot)
+                    saved = True
+                else:
+                    self.backend.apply(file_path, changes)
+                    saved = True
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении коллекции {file_path}: {e}")
+                saved = False
+            if not saved:
+                failed.append((file_path, rewrite, changes))
+        if self.journal is not None:
+            try:
+                self.journal.sync()
+            except Exception as e:
+                logger.error(f"Ошибка при сбросе журнала {self.journal.path}: {e}")
+                failed.extend(
+                    (file_path, rewrite, changes)
+                    for file_path, rewrite, changes, _ in batch if self._journaled(file_path)
+                )
+        if snapshots is not None:
+            if failed:
+                # Сжатие пропущено, а снимки шардов уже сбросили отметки измененных шардов:
+                # коллекции снимков нужно записать целиком при следующем сжатии
+                failed.extend((file_path, True, {}) for file_path in snapshots)
+            else:
+                failed.extend(self._compact(snapshots))
+        return failed
+
+    def _restore(self, failed: List[Tuple[str, bool, Dict[str, Any]]]) -> bool:
+        """Возвращает незаписанные изменения, чтобы повторить запись позже"""
+        for file_path, rewrite, changes in failed:
+            if rewrite:
+                self._dirty.add(file_path)
+            if file_path in self._shards:
+                # Какие из шардов записаны, неизвестно, поэтому повторяем все
+                sharded = self._shards[file_path]
+                sharded.dirty.update(range(sharded.shards))
+            pending = self._changes.setdefault(file_path, {})
+            for key, value in changes.items():
+                # Более новые изменения той же записи важнее
+                pending.setdefault(key, value)
+        return not failed
+
+    async def flush_async(self, compact: bool = False) -> bool:
+        """
+        Сбрасывает изменения на диск, не блокируя цикл событий
+
+        Сериализация и запись выполняются в отдельном потоке хранилища.
+        Вызовы в пределах commit_window объединяются в одну запись с одним
+        fsync (group commit), а пока идет запись, новые изменения копятся
+        и уходят следующей пачкой: повторные изменения одной записи
+        схлопываются, а коллекция, замененная несколько раз, пишется один раз.
+        Ждать результата нужно только там, где важно, что данные уже на диске.
+
+        Args:
+            compact: Принудительно сжать журнал в снимки коллекций
+        """
+        if compact:
+            self._compact_requested = True
+        if self._commit is None:
+            self._commit = asyncio.ensure_future(self._group_commit())
+        # shield: отмена одного из ожидающих не должна отменять общую запись
+        return await asyncio.shield(self._commit)
+
+    async def _group_commit(self) -> bool:
+        """Ждет окно group commit и записывает все накопленное одной пачкой"""
+        await asyncio.sleep(self.commit_window)
+        async with self._flush_lock:
+            # Вызовы после этого момента попадут уже в следующую запись
+            self._commit = None
+            compact, self._compact_requested = self._compact_requested, False
+            batch, snapshots = self._collect(compact)
+            if not batch and snapshots is None:
+                return True
+            failed = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._write, batch, snapshots
+            )
+            return self._restore(failed)
+
+    def _compact(self, snapshots: Dict[str, Dict[str, Any]]) -> List[Tuple[str, bool, Dict[str, Any]]]:
+        """Записывает снимки журналируемых коллекций и очищает журнал"""
+        for file_path, data in snapshots.items():
+            if file_path in self._shards:
+                saved = self._shards[file_path].write(data)
+            else:
+                saved = save_json(file_path, data)
+            if not saved:
+                # Журнал остается на месте, при следующем запуске он будет проигран.
+                # Снимки повторяются все: шарды следующих коллекций еще не записаны
+                return [(snapshot_path, True, {}) for snapshot_path in snapshots]
+        self.journal.truncate()
+        logger.debug(f"Журнал {self.journal.path} сжат в снимки коллекций")
+        return []
+
+    async def _flush_loop(self) -> None:
+        """Фоновая задача периодического сброса данных"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                logger.error(f"Ошибка при сбросе данных на диск: {e}")
+
+    def start(self) -> None:
+        """Запускает фоновый сброс данных"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Останавливает фоновый сброс и записывает оставшиеся изменения"""
+        if not self._opened:
+            # Хранилище не загрузилось (например, поврежден файл): ничего не пишем,
+            # чтобы не затереть данные на диске неполными
+            self._executor.shutdown()
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush_async(compact=True)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+        self._executor.shutdown()
+        self._opened = False
+
+# Общее хранилище данных процесса
+store = DataStore()
+
+# Счетчики статистики, обновляемые при каждом изменении коллекций
+stats_counter = StatsCounter()
+store.add_listener(stats_counter, CONTACTS_FILE, GROUPS_FILE, BLACKLIST_FILE)
+
 def add_contact(file_path: str, user_data: Dict[str, Any]) -> bool:
-    """Добавляет новый контакт в JSON файл"""
-    contacts = load_json(file_path)
+    """Добавляет новый контакт в хранилище"""
+    contacts = store.load_json(file_path)
     user_id = str(user_data['id'])
     
     if user_id not in contacts:
-        contacts[user_id] = {
+        store.put(file_path, user_id, {
             **user_data,
             'added_date': datetime.now().isoformat()
-        }
-        return save_json(file_path, contacts)
+        })
+        return True
     return False
 
+def attribute_contact(file_path: str, user_id: Any, group_id: Any) -> bool:
+    """Относит существующий контакт еще к одной группе, где он был замечен"""
+    contact = store.load_json(file_path).get(str(user_id))
+    if contact is None:
+        return False
+    group_ids = contact_group_ids(contact)
+    if str(group_id) in group_ids:
+        return False
+    store.put(file_path, str(user_id), {**contact, 'group_ids': group_ids + [str(group_id)]})
+    return True
+
 def add_to_blacklist(file_path: str, user_data: Dict[str, Any]) -> bool:
     """Добавляет пользователя в черный список"""
-    blacklist = load_json(file_path)
+    blacklist = store.load_json(file_path)
     user_id = str(user_data['id'])
     
     if user_id not in blacklist:
-        blacklist[user_id] = {
+        store.put(file_path, user_id, {
             **user_data,
             'added_date': datetime.now().isoformat()
-        }
-        return save_json(file_path, blacklist)
+        })
+        return True
     return False
 
 def is_in_blacklist(file_path: str, user_id: int) -> bool:
     """Проверяет, находится ли пользователь в черном списке"""
-    blacklist = load_json(file_path)
+    blacklist = store.load_json(file_path)
     return str(user_id) in blacklist
 
-def add_group(file_path: str, group_data: Dict[str, Any]) -> bool:
-    """Добавляет новую группу в JSON файл"""
-    groups = load_json(file_path)
+def add_group(file_path: str, group_data: Dict[str, Any], tx: Optional[Transaction] = None) -> bool:
+    """
+    Добавляет новую группу в хранилище
+
+    Args:
+        file_path: Путь коллекции групп
+        group_data: Данные группы
+        tx: Транзакция, в которой нужно выполнить добавление
+    """
+    target = tx or store
     group_id = str(group_data['id'])
+    exists = tx.get(file_path, group_id) is not None if tx else group_id in store.load_json(file_path)
     
-    if group_id not in groups:
-        groups[group_id] = {
+    if not exists:
+        target.put(file_path, group_id, {
             **group_data,
             'added_date': datetime.now().isoformat(),
             'contacts_count': 0
-        }
-        return save_json(file_path, groups)
+        })
+        return True
     return False
 
 def update_stats(stats_file: str, groups_file: str, contacts_file: str, blacklist_file: str):
-    """Обновляет статистику"""
+    """Обновляет статистику по текущим значениям счетчиков, не перебирая контакты"""
     try:
-        groups = load_json(groups_file)
-        contacts = load_json(contacts_file)
-        blacklist = load_json(blacklist_file)
-        
-        # Подсчитываем контакты по группам
-        group_contacts = {}
-        for group_id in groups:
-            group_contacts[group_id] = 0
-            
-        # Считаем контакты для каждой группы
-        for contact in contacts.values():
-            if 'group_id' in contact:
-                group_id = str(contact['group_id'])
-                if group_id in group_contacts:
-                    group_contacts[group_id] += 1
+        groups = store.load_json(groups_file)
         
-        # Обновляем статистику групп
-        for group_id, count in group_contacts.items():
-            if group_id in groups:
-                groups[group_id]['contacts_count'] = count
-        
-        # Сохраняем обновленные данные групп
-        save_json(groups_file, groups)
+        # Переносим счетчики в записи групп, сохраняя только изменившиеся
+        for group_id, group_data in groups.items():
+            count = stats_counter.group_contacts.get(group_id, 0)
+            if group_data.get('contacts_count') != count:
+                store.put(groups_file, group_id, {**group_data, 'contacts_count': count})
                 
         stats = {
-            'total_contacts': len(contacts),
-            'total_groups': len(groups),
-            'blacklisted': len(blacklist),
+            'total_contacts': stats_counter.total_contacts,
+            'total_groups': stats_counter.total_groups,
+            'blacklisted': stats_counter.total_blacklisted,
             'groups_stats': [
                 {
                     'id': group_id,
@@ -126,8 +646,19 @@ def update_stats(stats_file: str, groups_file: str, contacts_file: str, blacklis
             'last_update': datetime.now().strftime("%d.%m.%Y %H:%M")
         }
         
-        save_json(stats_file, stats)
+        store.save_json(stats_file, stats)
         return True
     except Exception as e:
         logger.error(f"Ошибка при обновлении статистики: {e}")
-        return False 
\ No newline at end of file
+        return False
+
+def rebuild_stats(stats_file: str, groups_file: str, contacts_file: str, blacklist_file: str) -> bool:
+    """Полностью пересчитывает счетчики по содержимому коллекций (восстановление)"""
+    try:
+        for file_path in (groups_file, contacts_file, blacklist_file):
+            stats_counter.reset(file_path, store.load_json(file_path))
+        logger.info("Счетчики статистики пересчитаны")
+    except Exception as e:
+        logger.error(f"Ошибка при пересчете статистики: {e}")
+        return False
+    return update_stats(stats_file, groups_file, contacts_file, blacklist_file)
@@ -0,0 +1,98 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from utils.json_utils import store
+from utils.logger import logger
+from config import (
+    NEGATIVE_CACHE_FILE, NEGATIVE_CACHE_TTLS, NEGATIVE_CACHE_MAX_TTL, NEGATIVE_CACHE_PRUNE_INTERVAL
+)
+
+class NegativeCache:
+    """
+    Кэш пользователей, которых не удалось найти или добавить в контакты
+
+    Для каждой неудачи запоминается причина и время, до которого повторять
+    попытку не нужно. Срок зависит от причины (NEGATIVE_CACHE_TTLS) и
+    удваивается с каждой следующей неудачей, но не больше NEGATIVE_CACHE_MAX_TTL.
+    Записи хранятся в общем хранилище и переживают перезапуск.
+
+    Истекшая запись хранится еще NEGATIVE_CACHE_MAX_TTL, чтобы следующая
+    неудача дала более длинную паузу, а затем удаляется (prune), иначе
+    коллекция росла бы без ограничений и переписывалась целиком при сбросе.
+    """
+
+    def __init__(self, file_path: str = NEGATIVE_CACHE_FILE):
+        self.file_path = file_path
+        # Время следующей очистки устаревших записей
+        self._next_prune = 0.0
+
+    def is_blocked(self, user_id: Any) -> bool:
+        """Проверяет, нужно ли пропустить пользователя без запросов к Telegram"""
+        entry = store.load_json(self.file_path).get(str(user_id))
+        return entry is not None and entry['until'] > time.time()
+
+    def prune(self) -> int:
+        """Удаляет записи, истекшие больше NEGATIVE_CACHE_MAX_TTL назад, и возвращает их количество"""
+        stale_before = time.time() - NEGATIVE_CACHE_MAX_TTL
+        stale = [
+            user_id for user_id, entry in store.load_json(self.file_path).items()
+            if entry['until'] < stale_before
+        ]
+        for user_id in stale:
+            store.pop(self.file_path, user_id)
+        if stale:
+            logger.info(f"Из кэша неудачных добавлений удалено устаревших записей: {len(stale)}")
+        return len(stale)
+
+    def record(self, user_id: Any, reason: str, error: str = '') -> None:
+        """
+        Запоминает неудачу для пользователя
+
+        Args:
+            user_id: ID пользователя
+            reason: Причина: not_found, not_user, privacy или add_failed
+            error: Текст ошибки для просмотра админом
+        """
+        now = time.time()
+        if now >= self._next_prune:
+            self._next_prune = now + NEGATIVE_CACHE_PRUNE_INTERVAL
+            self.prune()
+
+        user_id = str(user_id)
+        entry = store.load_json(self.file_path).get(user_id) or {}
+        failures = entry.get('failures', 0) + 1
+        ttl = NEGATIVE_CACHE_TTLS.get(reason, NEGATIVE_CACHE_TTLS['add_failed'])
+        ttl = min(ttl * 2 ** (failures - 1), NEGATIVE_CACHE_MAX_TTL)
+        store.put(self.file_path, user_id, {
+            'reason': reason,
+            'error': error[:200],
+            'failures': failures,
+            'until': now + ttl,
+            'updated': datetime.now().strftime("%d.%m.%Y %H:%M")
+        })
+        logger.debug(f"Пользователь {user_id} пропускается {ttl} сек. (причина: {reason}, неудач: {failures})")
+
+    def forget(self, user_id: Any) -> bool:
+        """Удаляет запись о пользователе, например после успешного добавления"""
+        return store.pop(self.file_path, str(user_id)) is not None
+
+    def clear(self) -> int:
+        """Очищает кэш целиком и возвращает количество удаленных записей"""
+        entries = store.load_json(self.file_path)
+        count = len(entries)
+        store.save_json(self.file_path, {})
+        return count
+
+    def entries(self, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Действующие записи, начиная с самых длительных блокировок"""
+        now = time.time()
+        active = [
+            (user_id, entry)
+            for user_id, entry in store.load_json(self.file_path).items()
+            if entry['until'] > now
+        ]
+        active.sort(key=lambda item: item[1]['until'], reverse=True)
+        return active[:limit] if limit else active
+
+# Общий кэш неудачных добавлений
+negative_cache = NegativeCache()
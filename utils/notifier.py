@@ -0,0 +1,168 @@
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from utils.json_utils import store
+from utils.logger import logger
+from utils.rate_limit import TokenBucket
+from config import (
+    ADMINS_FILE,
+    NOTIFY_CONCURRENCY, NOTIFY_GLOBAL_RATE, NOTIFY_PER_CHAT_INTERVAL,
+    NOTIFY_DIGEST_WINDOW, NOTIFY_MAX_RETRIES
+)
+
+# Максимальная длина сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+def contact_message(user_data: Dict[str, Any]) -> str:
+    """Текст уведомления об одном новом контакте"""
+    return (
+        f"✅ <b>Новый контакт добавлен из группы {user_data.get('group_title', 'Неизвестная группа')}:</b>\n\n"
+        f"👤 {user_data['first_name']} {user_data.get('last_name', '')}\n"
+        f"🔗 @{user_data.get('username', 'Нет username')}\n"
+        f"📱 {user_data.get('phone', 'Нет телефона')}\n"
+        f"🆔 {user_data['id']}"
+    )
+
+def contact_digest_line(user_data: Dict[str, Any]) -> str:
+    """Строка о контакте для сводного уведомления"""
+    username = f"@{user_data['username']}" if user_data.get('username') else 'без username'
+    return (
+        f"👤 {user_data['first_name']} {user_data.get('last_name') or ''} "
+        f"({username}, 🆔 {user_data['id']}) - {user_data.get('group_title', 'Неизвестная группа')}"
+    )
+
+class AdminNotifier:
+    """
+    Очередь уведомлений админам о новых контактах
+
+    Уведомления отправляются воркерами в фоне, поэтому не задерживают
+    добавление контактов. Общий темп ограничен NOTIFY_GLOBAL_RATE сообщений
+    в секунду, в один чат - не чаще раза в NOTIFY_PER_CHAT_INTERVAL секунд.
+    При TelegramRetryAfter отправка приостанавливается на указанное время
+    и сообщение повторяется. Если задан NOTIFY_DIGEST_WINDOW, контакты
+    копятся и отправляются каждому админу одним сообщением за окно.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        concurrency: int = NOTIFY_CONCURRENCY,
+        global_rate: float = NOTIFY_GLOBAL_RATE,
+        per_chat_interval: float = NOTIFY_PER_CHAT_INTERVAL,
+        digest_window: float = NOTIFY_DIGEST_WINDOW,
+        max_retries: int = NOTIFY_MAX_RETRIES
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.per_chat_interval = per_chat_interval
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(global_rate, global_rate)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # ID чата -> строки контактов, ожидающие сводного уведомления
+        self._digest: Dict[int, List[str]] = {}
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_sent_at: Dict[int, float] = {}
+        self._resume_at = 0.0
+        self._workers: List[asyncio.Task] = []
+        self._digest_task: Optional[asyncio.Task] = None
+
+    def notify_contact(self, group_id: Any, user_data: Dict[str, Any]) -> None:
+        """Ставит уведомление о новом контакте для всех админов группы"""
+        group_admins = store.load_json(ADMINS_FILE).get(str(group_id), {})
+        for admin_id in group_admins:
+            chat_id = int(admin_id)
+            if self.digest_window:
+                self._digest.setdefault(chat_id, []).append(contact_digest_line(user_data))
+            else:
+                self.send(chat_id, contact_message(user_data))
+
+    def send(self, chat_id: int, text: str) -> None:
+        """Ставит сообщение в очередь на отправку"""
+        self.queue.put_nowait((chat_id, text, 0))
+
+    def start(self) -> None:
+        """Запускает воркеры и, в режиме дайджеста, периодическую отправку сводок"""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.digest_window and self._digest_task is None:
+            self._digest_task = asyncio.create_task(self._digest_loop())
+
+    async def stop(self, timeout: float = 5) -> None:
+        """Отправляет накопленные сводки, ждет очередь не дольше timeout и останавливает воркеры"""
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            await asyncio.gather(self._digest_task, return_exceptions=True)
+            self._digest_task = None
+        self._flush_digest()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не отправлено уведомлений: {self.queue.qsize()}")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _flush_digest(self) -> None:
+        """Превращает накопленные строки в сообщения, не длиннее лимита Telegram"""
+        digest, self._digest = self._digest, {}
+        for chat_id, lines in digest.items():
+            header = f"✅ <b>Новые контакты ({len(lines)}):</b>\n\n"
+            text = header
+            for line in lines:
+                if len(text) + len(line) + 1 > MESSAGE_LIMIT:
+                    self.send(chat_id, text)
+                    text = ''
+                text += line + '\n'
+            if text:
+                self.send(chat_id, text)
+
+    async def _digest_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.digest_window)
+            self._flush_digest()
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, text, attempt = await self.queue.get()
+            try:
+                await self._deliver(chat_id, text, attempt)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке уведомления админу {chat_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id: int, text: str, attempt: int) -> None:
+        """Отправляет одно сообщение с учетом ограничений на чат и общий темп"""
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            delay = self._chat_sent_at.get(chat_id, 0) + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text)
+            except TelegramRetryAfter as e:
+                # Bot API просит подождать: приостанавливаем все отправки и повторяем
+                self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+                self.bucket.drain()
+                if attempt < self.max_retries:
+                    self.queue.put_nowait((chat_id, text, attempt + 1))
+                else:
+                    logger.error(f"Уведомление админу {chat_id} не отправлено после {attempt + 1} попыток")
+            finally:
+                self._chat_sent_at[chat_id] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние очереди уведомлений"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'digest_pending': sum(len(lines) for lines in self._digest.values()),
+            'paused_for': max(0.0, round(self._resume_at - time.monotonic(), 1))
+        }
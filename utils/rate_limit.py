@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """
+    Ограничитель темпа запросов по алгоритму token bucket
+
+    Токены пополняются со скоростью rate в секунду до capacity,
+    каждый запрос забирает один токен и ждет, если токенов нет.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Ждет свободный токен и забирает его"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def drain(self) -> None:
+        """Обнуляет запас токенов, например после ограничения со стороны Telegram"""
+        self._refill()
+        self._tokens = 0
@@ -0,0 +1,145 @@
+import gzip
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Tuple
+from utils.logger import logger
+from config import DATA_FORMAT, DATA_FORMATS
+
+# Необязательные библиотеки: без них соответствующие форматы недоступны
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Сигнатуры сжатых файлов
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+class DecodeError(ValueError):
+    """Содержимое файла не разбирается ни одним из форматов"""
+
+def _json_pretty(data: Any) -> bytes:
+    # Прежний формат файлов: удобно читать и править вручную
+    return json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+
+def _json_compact(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+def _gzip(raw: bytes) -> bytes:
+    # mtime=0: одинаковые данные дают одинаковый файл
+    return gzip.compress(raw, compresslevel=6, mtime=0)
+
+def _zstd(raw: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(raw)
+
+# Формат -> (функция кодирования, необходимая библиотека)
+ENCODERS: Dict[str, Tuple[Callable[[Any], bytes], Optional[str]]] = {
+    'json-pretty': (_json_pretty, None),
+    'json': (_json_compact, None),
+    'msgpack': (_msgpack, 'msgpack'),
+}
+
+# Сжатие -> (функция сжатия, необходимая библиотека)
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes], bytes], Optional[str]]] = {
+    'gzip': (_gzip, None),
+    'zstd': (_zstd, 'zstandard'),
+}
+
+def _available(module: Optional[str]) -> bool:
+    return module is None or globals().get(module) is not None
+
+def parse_format(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Разбирает имя формата вида "msgpack+zstd"
+
+    Raises:
+        ValueError: Неизвестный формат или для него не установлена библиотека
+    """
+    encoding, _, compression = name.partition('+')
+    if encoding not in ENCODERS:
+        raise ValueError(f"Неизвестный формат данных {name}, доступны: {', '.join(ENCODERS)}")
+    if compression and compression not in COMPRESSORS:
+        raise ValueError(f"Неизвестное сжатие {compression}, доступны: {', '.join(COMPRESSORS)}")
+    for module in (ENCODERS[encoding][1], COMPRESSORS[compression][1] if compression else None):
+        if not _available(module):
+            raise ValueError(f"Для формата {name} нужна библиотека {module}")
+    return encoding, compression or None
+
+def format_of(file_path: str) -> str:
+    """Формат, в котором пишется коллекция (DATA_FORMATS или DATA_FORMAT)"""
+    return DATA_FORMATS.get(file_path, DATA_FORMAT)
+
+def encode(data: Any, name: str) -> bytes:
+    """Кодирует данные в указанный формат"""
+    encoding, compression = parse_format(name)
+    raw = ENCODERS[encoding][0](data)
+    if compression:
+        raw = COMPRESSORS[compression][0](raw)
+    return raw
+
+def decode(raw: bytes) -> Any:
+    """
+    Декодирует содержимое файла, определяя формат по первым байтам
+
+    Сжатие распознается по сигнатуре gzip или zstd. JSON начинается
+    с "{" или "[", остальное читается как msgpack.
+
+    Raises:
+        DecodeError: Файл поврежден или для его формата нет библиотеки
+    """
+    try:
+        if raw.startswith(GZIP_MAGIC):
+            raw = gzip.decompress(raw)
+        elif raw.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise DecodeError("файл сжат zstd, а библиотека zstandard не установлена")
+            # Размер данных в кадре может быть не указан, поэтому читаем потоком
+            raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+
+        if raw.lstrip()[:1] in (b'{', b'['):
+            return orjson.loads(raw) if orjson is not None else json.loads(raw.decode('utf-8'))
+        if msgpack is None:
+            raise DecodeError("файл не в формате JSON, а библиотека msgpack не установлена")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    except DecodeError:
+        raise
+    except Exception as e:
+        # Ошибки gzip, zstd, json и msgpack не имеют общего предка
+        raise DecodeError(str(e) or type(e).__name__) from e
+
+def convert(file_path: str, name: str) -> bool:
+    """Перезаписывает файл в указанном формате"""
+    from utils.json_utils import load_json, save_json
+
+    return save_json(file_path, load_json(file_path), name)
+
+if __name__ == "__main__":
+    # Перевод файлов данных в другой формат при остановленном боте:
+    # python -m utils.serializers <формат> [файлы...]
+    # Без списка файлов переводятся все файлы data/, включая шарды.
+    # Формат при чтении определяется по содержимому, поэтому после перевода
+    # задайте тот же формат в DATA_FORMAT или DATA_FORMATS, иначе при следующей
+    # записи файлы вернутся к формату из config.
+    from config import DATA_DIR
+
+    target = sys.argv[1]
+    parse_format(target)
+    paths = sys.argv[2:] or [str(path) for path in sorted(Path(DATA_DIR).rglob('*.json'))]
+    for path in paths:
+        size = Path(path).stat().st_size
+        if convert(path, target):
+            logger.info(f"{path}: {size} -> {Path(path).stat().st_size} байт ({target})")
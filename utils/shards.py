@@ -0,0 +1,185 @@
+import os
+import shutil
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Set
+from utils.journal import Journal
+from utils.logger import logger
+from config import SHARDED_FILES, JOURNAL_FILE
+
+# Версия формата манифеста
+MANIFEST_VERSION = 1
+
+def manifest_of(file_path: str) -> Path:
+    """Путь к манифесту шардов коллекции"""
+    return Path(file_path).with_suffix('') / 'manifest.json'
+
+class ShardedFile:
+    """
+    Коллекция, разбитая на несколько JSON файлов по хэшу ключа
+
+    Файлы лежат в каталоге рядом с исходным файлом (data/contacts.json ->
+    data/contacts/shard_000.json ...), а manifest.json хранит количество
+    шардов. Индекс подписан на коллекцию в хранилище и помнит, в каких
+    шардах были изменения, поэтому при записи перезаписываются только они.
+    Шарды читаются параллельно.
+
+    Коллекция из одного файла раскладывается по шардам при первой записи,
+    после чего исходный файл переименовывается в *.pre-shard, чтобы его
+    устаревшую копию больше ничто не прочитало.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        shards: int,
+        load: Callable[[str], Dict[str, Any]],
+        save: Callable[[str, Dict[str, Any]], bool]
+    ):
+        self.file_path = file_path
+        self.directory = Path(file_path).with_suffix('')
+        self.shards = shards
+        self._load = load
+        self._save = save
+        # Ключи записей по шардам
+        self._keys: List[Set[str]] = [set() for _ in range(shards)]
+        # Шарды с изменениями, которые еще не записаны
+        self.dirty: Set[int] = set()
+
+    @property
+    def manifest_path(self) -> str:
+        return str(self.directory / 'manifest.json')
+
+    def shard_path(self, shard: int) -> str:
+        return str(self.directory / f'shard_{shard:03d}.json')
+
+    def shard_of(self, key: str) -> int:
+        """Номер шарда записи"""
+        return zlib.crc32(key.encode('utf-8')) % self.shards
+
+    def exists(self) -> bool:
+        """Проверяет, что коллекция уже хранится в шардах"""
+        return Path(self.manifest_path).exists()
+
+    def load(self) -> Dict[str, Any]:
+        """Читает все шарды параллельно и собирает коллекцию"""
+        manifest = self._load(self.manifest_path)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Неизвестная версия манифеста {self.manifest_path}")
+        if manifest['shards'] != self.shards:
+            # Количество шардов задает манифест, изменить его можно только решардингом
+            logger.warning(
+                f"{self.file_path}: в манифесте {manifest['shards']} шардов вместо {self.shards}, "
+                f"используется значение из манифеста"
+            )
+            self.shards = manifest['shards']
+            self._keys = [set() for _ in range(self.shards)]
+
+        data: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=min(self.shards, 8)) as executor:
+            for shard_data in executor.map(self._load, map(self.shard_path, range(self.shards))):
+                data.update(shard_data)
+        return data
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Раскладывает ключи коллекции по шардам; все шарды считаются измененными"""
+        self._keys = [set() for _ in range(self.shards)]
+        for key in data:
+            self._keys[self.shard_of(key)].add(key)
+        self.dirty = set(range(self.shards))
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Отмечает шард записи как измененный"""
+        shard = self.shard_of(key)
+        if new_value is None:
+            self._keys[shard].discard(key)
+        else:
+            self._keys[shard].add(key)
+        self.dirty.add(shard)
+
+    def snapshot(self, data: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """
+        Забирает содержимое измененных шардов для записи
+
+        Выполняется в потоке событий: перебираются только ключи измененных
+        шардов, а записи не копируются, так как они не меняются на месте.
+        """
+        shards = {shard: {key: data[key] for key in self._keys[shard]} for shard in self.dirty}
+        self.dirty = set()
+        return shards
+
+    def write(self, shards: Dict[int, Dict[str, Any]], retire: bool = True) -> bool:
+        """
+        Записывает шарды и, при первой записи, манифест
+
+        Args:
+            retire: После записи манифеста убрать исходный файл коллекции
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for shard, shard_data in shards.items():
+            if not self._save(self.shard_path(shard), shard_data):
+                return False
+        # Манифест пишется последним: без него коллекция читается из исходного файла
+        if not self.exists():
+            if not self._save(self.manifest_path, {'version': MANIFEST_VERSION, 'shards': self.shards}):
+                return False
+            if retire:
+                self.retire_single_file()
+        return True
+
+    def retire_single_file(self) -> None:
+        """Переименовывает исходный файл коллекции: данные уже в шардах"""
+        path = Path(self.file_path)
+        if path.exists():
+            backup = path.with_name(path.name + '.pre-shard')
+            os.replace(path, backup)
+            logger.info(f"{self.file_path} разложен по шардам, прежний файл сохранен как {backup}")
+
+def reshard(file_path: str, shards: int) -> int:
+    """
+    Переносит коллекцию из одного файла или из шардов в новое количество шардов
+
+    Запускать при остановленном боте: при остановке журнал сжимается
+    в снимки, и все данные коллекции находятся в ее файлах.
+
+    Returns:
+        Количество перенесенных записей
+    """
+    from functools import partial
+    from utils.json_utils import load_json, save_json
+    from utils.serializers import format_of
+
+    save = partial(save_json, data_format=format_of(file_path))
+    if Journal.has_records(JOURNAL_FILE):
+        raise RuntimeError(f"Журнал {JOURNAL_FILE} не пуст: запустите и остановите бота, чтобы сжать его")
+
+    old = ShardedFile(file_path, shards, load_json, save)
+    data = old.load() if old.exists() else load_json(file_path)
+
+    # Сначала записываем новые шарды во временный каталог, затем подменяем каталог целиком
+    target = ShardedFile(file_path, shards, load_json, save)
+    final_directory = target.directory
+    target.directory = final_directory.with_name(final_directory.name + '.reshard')
+    shutil.rmtree(target.directory, ignore_errors=True)
+    target.reset(file_path, data)
+    # Исходный файл убираем только после подмены каталога
+    if not target.write(target.snapshot(data), retire=False):
+        raise RuntimeError(f"Не удалось записать шарды {file_path}")
+
+    if final_directory.exists():
+        backup = final_directory.with_name(final_directory.name + '.old')
+        final_directory.rename(backup)
+        target.directory.rename(final_directory)
+        shutil.rmtree(backup)
+    else:
+        target.directory.rename(final_directory)
+    target.retire_single_file()
+    return len(data)
+
+if __name__ == "__main__":
+    # Решардинг: python -m utils.shards [количество шардов]
+    for file_path, default_shards in SHARDED_FILES.items():
+        count = reshard(file_path, int(sys.argv[1]) if len(sys.argv) > 1 else default_shards)
+        logger.info(f"{file_path}: {count} записей разложено по шардам")
@@ -0,0 +1,54 @@
+import asyncio
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Объединяет одновременные операции с одинаковым ключом
+
+    Первый вызов выполняет операцию, а вызовы с тем же ключом, пришедшие
+    до ее завершения, ждут и получают тот же результат или ту же ошибку.
+    После завершения ключ освобождается, следующий вызов выполнится заново.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет func или присоединяется к уже идущему вызову с тем же ключом"""
+        future = self._calls.get(key)
+        if future is not None:
+            # shield: отмена одного из ожидающих не должна отменять общий вызов
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            # Помечаем ошибку полученной, даже если других ожидающих не было
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+def coalesce(key: Callable[..., Hashable]):
+    """
+    Декоратор: одновременные вызовы функции с одинаковым ключом разделяют один результат
+
+    Args:
+        key: Функция, вычисляющая ключ из аргументов вызова
+    """
+    def decorator(func):
+        flight = SingleFlight()
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(key(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        return wrapper
+    return decorator
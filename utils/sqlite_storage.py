@@ -0,0 +1,192 @@
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+from utils.logger import logger
+from config import CONTACTS_FILE, BLACKLIST_FILE, GROUPS_FILE, ADMINS_FILE
+
+# Коллекция -> (таблица, ключевой столбец, индексируемые поля записи)
+TABLES = {
+    CONTACTS_FILE: ('contacts', 'user_id', ('username', 'group_id', 'added_date')),
+    BLACKLIST_FILE: ('blacklist', 'user_id', ('username', 'added_date')),
+    GROUPS_FILE: ('tracked_groups', 'group_id', ('username', 'added_date')),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    group_id TEXT,
+    added_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contacts_username ON contacts (username COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_contacts_group_id ON contacts (group_id);
+CREATE INDEX IF NOT EXISTS idx_contacts_added_date ON contacts (added_date);
+
+CREATE TABLE IF NOT EXISTS blacklist (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    added_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blacklist_username ON blacklist (username COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_blacklist_added_date ON blacklist (added_date);
+
+CREATE TABLE IF NOT EXISTS tracked_groups (
+    group_id TEXT PRIMARY KEY,
+    username TEXT,
+    added_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tracked_groups_username ON tracked_groups (username COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS group_admins (
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_group_admins_user_id ON group_admins (user_id);
+"""
+
+# Форматы дат, которые встречаются в записях
+DATE_FORMATS = ("%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M:%S")
+
+def normalize_date(value: Any) -> Optional[str]:
+    """Приводит дату записи к ISO формату, чтобы индекс по дате был упорядочен"""
+    if not value:
+        return None
+    value = str(value)
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).isoformat()
+        except ValueError:
+            continue
+    return value
+
+class SQLiteStorage:
+    """
+    Хранилище контактов, групп, черного списка и админов в локальной базе SQLite
+
+    Каждая запись хранится целиком в столбце data, а поля, по которым
+    нужен поиск (username, group_id, added_date), вынесены в индексируемые
+    столбцы. Изменения применяются построчно, поэтому добавление одного
+    контакта не требует перезаписи всей коллекции.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def manages(self, file_path: str) -> bool:
+        """Проверяет, хранится ли коллекция в базе"""
+        return file_path in TABLES or file_path == ADMINS_FILE
+
+    def is_empty(self) -> bool:
+        """Проверяет, что в базе нет ни одной записи"""
+        for table in ('contacts', 'blacklist', 'tracked_groups', 'group_admins'):
+            if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def load(self, file_path: str) -> Dict[str, Any]:
+        """Загружает коллекцию в виде словаря, как в JSON файле"""
+        if file_path == ADMINS_FILE:
+            admins: Dict[str, Dict[str, Any]] = {}
+            rows = self._conn.execute("SELECT group_id, user_id, data FROM group_admins")
+            for group_id, user_id, data in rows:
+                admins.setdefault(group_id, {})[user_id] = json.loads(data)
+            return admins
+
+        table, key_column, _ = TABLES[file_path]
+        rows = self._conn.execute(f"SELECT {key_column}, data FROM {table}")
+        return {key: json.loads(data) for key, data in rows}
+
+    def apply(self, file_path: str, changes: Dict[str, Optional[Any]]) -> None:
+        """
+        Применяет построчные изменения коллекции в одной транзакции
+
+        Args:
+            file_path: Путь коллекции из config
+            changes: Ключ записи -> новое значение или None для удаления
+        """
+        with self._conn:
+            self._apply(file_path, changes)
+
+    def replace(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Полностью заменяет содержимое коллекции"""
+        with self._conn:
+            table = 'group_admins' if file_path == ADMINS_FILE else TABLES[file_path][0]
+            self._conn.execute(f"DELETE FROM {table}")
+            self._apply(file_path, data)
+
+    def _apply(self, file_path: str, changes: Dict[str, Optional[Any]]) -> None:
+        if file_path == ADMINS_FILE:
+            for group_id, group_admins in changes.items():
+                self._conn.execute("DELETE FROM group_admins WHERE group_id = ?", (group_id,))
+                if group_admins:
+                    self._conn.executemany(
+                        "INSERT INTO group_admins (group_id, user_id, data) VALUES (?, ?, ?)",
+                        [
+                            (group_id, user_id, json.dumps(admin_data, ensure_ascii=False))
+                            for user_id, admin_data in group_admins.items()
+                        ]
+                    )
+            return
+
+        table, key_column, fields = TABLES[file_path]
+        deleted = [(key,) for key, value in changes.items() if value is None]
+        upserted: List[tuple] = [
+            self._row(key, value, fields)
+            for key, value in changes.items()
+            if value is not None
+        ]
+        if deleted:
+            self._conn.executemany(f"DELETE FROM {table} WHERE {key_column} = ?", deleted)
+        if upserted:
+            columns = ', '.join((key_column, *fields, 'data'))
+            placeholders = ', '.join('?' * (len(fields) + 2))
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+                upserted
+            )
+
+    @staticmethod
+    def _row(key: str, value: Dict[str, Any], fields: tuple) -> tuple:
+        """Формирует строку таблицы из записи коллекции"""
+        columns = []
+        for field in fields:
+            field_value = value.get(field)
+            if field == 'added_date':
+                field_value = normalize_date(field_value)
+            columns.append(str(field_value) if field_value not in (None, '') else None)
+        return (key, *columns, json.dumps(value, ensure_ascii=False))
+
+    def import_collections(self, collections: Dict[str, Dict[str, Any]]) -> None:
+        """Импортирует коллекции из JSON файлов, заменяя содержимое таблиц"""
+        for file_path, data in collections.items():
+            if self.manages(file_path):
+                self.replace(file_path, data)
+                logger.info(f"Импортировано {len(data)} записей из {file_path} в {self.db_path}")
+
+    def close(self) -> None:
+        """Закрывает соединение с базой"""
+        self._conn.close()
+
+if __name__ == "__main__":
+    # Разовый импорт существующих data/*.json в базу SQLite
+    from config import SQLITE_FILE
+    from utils.json_utils import read_json_collections
+
+    collections = read_json_collections((CONTACTS_FILE, BLACKLIST_FILE, GROUPS_FILE, ADMINS_FILE))
+    storage = SQLiteStorage(SQLITE_FILE)
+    storage.import_collections(collections)
+    storage.close()
@@ -0,0 +1,60 @@
+from typing import Dict, Any, List, Optional
+from config import CONTACTS_FILE, GROUPS_FILE, BLACKLIST_FILE
+
+def contact_group_ids(contact: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    ID групп, к которым относится контакт
+
+    group_id - группа, из которой контакт был добавлен, group_ids - все
+    отслеживаемые группы, где он был замечен. У старых записей есть только group_id.
+    """
+    if not contact:
+        return []
+    if contact.get('group_ids'):
+        return [str(group_id) for group_id in contact['group_ids']]
+    return [str(contact['group_id'])] if contact.get('group_id') else []
+
+class StatsCounter:
+    """
+    Счетчики статистики, которые обновляются при каждом изменении коллекций
+
+    Подписывается на контакты, группы и черный список в хранилище:
+    добавление или удаление записи меняет счетчики за O(1), а полный
+    пересчет выполняется только при загрузке коллекции или явном вызове reset.
+    """
+
+    def __init__(self):
+        self.total_contacts = 0
+        self.total_groups = 0
+        self.total_blacklisted = 0
+        # ID группы -> количество контактов, замеченных в ней
+        self.group_contacts: Dict[str, int] = {}
+
+    def reset(self, file_path: str, data: Dict[str, Any]) -> None:
+        """Пересчитывает счетчики коллекции по ее полному содержимому"""
+        if file_path == CONTACTS_FILE:
+            self.total_contacts = len(data)
+            self.group_contacts = {}
+            for contact in data.values():
+                self._count_group(contact, 1)
+        elif file_path == GROUPS_FILE:
+            self.total_groups = len(data)
+        elif file_path == BLACKLIST_FILE:
+            self.total_blacklisted = len(data)
+
+    def update(self, file_path: str, key: str, old_value: Optional[Any], new_value: Optional[Any]) -> None:
+        """Учитывает изменение одной записи коллекции"""
+        delta = (new_value is not None) - (old_value is not None)
+        if file_path == CONTACTS_FILE:
+            self.total_contacts += delta
+            self._count_group(old_value, -1)
+            self._count_group(new_value, 1)
+        elif file_path == GROUPS_FILE:
+            self.total_groups += delta
+        elif file_path == BLACKLIST_FILE:
+            self.total_blacklisted += delta
+
+    def _count_group(self, contact: Optional[Dict[str, Any]], delta: int) -> None:
+        """Меняет счетчики групп, к которым относится контакт"""
+        for group_id in contact_group_ids(contact):
+            self.group_contacts[group_id] = self.group_contacts.get(group_id, 0) + delta
@@ -1,16 +1,46 @@
 import logging
-from telethon import TelegramClient
+from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError, UserPrivacyRestrictedError
 from telethon.tl.functions.contacts import AddContactRequest
 from telethon.tl.types import InputUser, User
 from telethon.tl.types import Channel, Chat
 from telethon.tl.functions.channels import GetParticipantsRequest
 from telethon.tl.types import ChannelParticipantsSearch
 from datetime import datetime
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, Union, Callable, Awaitable
 from utils.logger import logger
-from config import CONTACTS_FILE
-from utils.json_utils import load_json, save_json
+from config import CONTACTS_FILE, GROUPS_FILE
+from utils.json_utils import store
+from utils.entity_cache import entity_cache
+from utils.negative_cache import negative_cache
+from utils.indexes import contact_usernames, blacklist_usernames
+from utils.single_flight import coalesce
 
+class GroupMessageFilter:
+    """
+    Регистрирует обработчик новых сообщений Telethon только для отслеживаемых групп
+
+    Фильтр по чатам проверяется внутри Telethon до вызова обработчика,
+    поэтому сообщения из остальных диалогов аккаунта не доходят до Python кода.
+    Список чатов фиксируется при регистрации, поэтому после добавления
+    или удаления группы нужно вызвать refresh().
+    """
+
+    def __init__(self, client: TelegramClient, callback: Callable[[Any], Awaitable[None]]):
+        self.client = client
+        self.callback = callback
+
+    def refresh(self) -> None:
+        """Перерегистрирует обработчик с актуальным списком отслеживаемых групп"""
+        # В groups.json хранятся ID без префикса -100, Telethon сам
+        # сопоставляет их со всеми вариантами ID чата
+        chats = [int(group_id) for group_id in store.load_json(GROUPS_FILE)]
+        self.client.remove_event_handler(self.callback)
+        self.client.add_event_handler(self.callback, events.NewMessage(chats=chats))
+        logger.debug(f"Обработчик сообщений подписан на {len(chats)} групп")
+
+# Одновременные сообщения одного нового пользователя приводят к одному добавлению
+@coalesce(lambda client, user_data: str(user_data['id']))
 async def add_contact_to_telegram(
     client: TelegramClient,
     user_data: Dict[str, Any]
@@ -24,22 +54,37 @@ async def add_contact_to_telegram(
         
     Returns:
         Dict с результатом операции или None в случае ошибки
+        
+    Raises:
+        FloodWaitError: Telegram ограничил частоту запросов, добавление нужно повторить позже
     """
     try:
         try:
-            user = await client.get_entity(user_data['id'])
+            user = await entity_cache.get_entity(client, user_data['id'])
+        except FloodWaitError:
+            raise
         except Exception:
             try:
-                if user_data.get('username'):
-                    user = await client.get_entity(f"@{user_data['username']}")
+                username = user_data.get('username')
+                # Username уже известного контакта или заблокированного пользователя
+                # не разрешаем через Telegram
+                if contact_usernames.get(username) or blacklist_usernames.get(username):
+                    logger.info(f"Пользователь @{username} уже есть в контактах или черном списке")
+                    return None
+                if username:
+                    user = await entity_cache.get_entity(client, f"@{username}")
                 else:
                     raise ValueError("Нет доступных данных для поиска пользователя")
+            except FloodWaitError:
+                raise
             except Exception as e:
                 logger.error(f"Не удалось найти пользователя: {e}")
+                negative_cache.record(user_data['id'], 'not_found', str(e))
                 return None
 
         if not isinstance(user, User):
             logger.error("Найденная сущность не является пользователем")
+            negative_cache.record(user_data['id'], 'not_user')
             return None
 
         try:
@@ -59,7 +104,6 @@ async def add_contact_to_telegram(
             
             if result:
                 # Создаем запись для базы
-                contacts = load_json(CONTACTS_FILE)
                 user_id_str = str(user.id)
                 
                 contact_data = {
@@ -73,24 +117,40 @@ async def add_contact_to_telegram(
                     'added_date': datetime.now().strftime("%d.%m.%Y %H:%M")
                 }
                 
-                # Сохраняем в базу
-                contacts[user_id_str] = contact_data
-                save_json(CONTACTS_FILE, contacts)
+                # Сохраняем в базу. Пока шел запрос к Telegram, контакт мог
+                # появиться в базе другим путем: тогда его запись не перезаписываем
+                async with store.transaction(CONTACTS_FILE) as tx:
+                    if tx.get(CONTACTS_FILE, user_id_str) is not None:
+                        logger.info(f"Контакт {user_id_str} уже сохранен в базе")
+                        return None
+                    tx.put(CONTACTS_FILE, user_id_str, contact_data)
+                negative_cache.forget(user_id_str)
                 logger.debug(f"Контакт {user.first_name} добавлен в базу")
                 
                 return contact_data
             else:
                 logger.error("Не удалось добавить контакт")
+                negative_cache.record(user.id, 'add_failed')
                 return None
 
+        except FloodWaitError:
+            raise
+        except UserPrivacyRestrictedError as e:
+            logger.info(f"Пользователь {user.id} запретил добавление в контакты настройками приватности")
+            negative_cache.record(user.id, 'privacy', str(e))
+            return None
         except Exception as e:
             logger.error(f"Ошибка при добавлении контакта: {e}")
+            negative_cache.record(user.id, 'add_failed', str(e))
             return None
 
+    except FloodWaitError:
+        raise
     except Exception as e:
         logger.error(f"Общая ошибка при добавлении контакта: {e}")
         return None
 
+@coalesce(lambda client, group_id: str(group_id))
 async def get_group_info(client: TelegramClient, group_id: str) -> Optional[Dict[str, Any]]:
     """
     Получает информацию о группе
@@ -110,14 +170,14 @@ async def get_group_info(client: TelegramClient, group_id: str) -> Optional[Dict
                 channel_id = int(group_id[4:])
                 # Добавляем обратно -100 в числовом формате
                 full_id = int(f"-100{channel_id}")
-                entity = await client.get_entity(full_id)
+                entity = await entity_cache.get_entity(client, full_id)
             except ValueError as e:
                 logger.error(f"Неверный формат ID группы {group_id}: {e}")
                 return None
         else:
             # Если это username, используем как есть
             try:
-                entity = await client.get_entity(group_id)
+                entity = await entity_cache.get_entity(client, group_id)
             except ValueError as e:
                 logger.error(f"Не удалось найти группу по username {group_id}: {e}")
                 return None
@@ -155,6 +215,7 @@ async def get_group_info(client: TelegramClient, group_id: str) -> Optional[Dict
         logger.error(f"Ошибка при получении информации о группе {group_id}: {e}")
         return None
 
+@coalesce(lambda client, group_id, user_id: (str(group_id), user_id))
 async def is_admin_in_group(client: TelegramClient, group_id: str, user_id: int) -> bool:
     """
     Проверяет, является ли пользователь администратором группы
@@ -174,10 +235,10 @@ async def is_admin_in_group(client: TelegramClient, group_id: str, user_id: int)
             channel_id = int(group_id[4:])
             # Добавляем обратно -100 в числовом формате
             full_id = int(f"-100{channel_id}")
-            entity = await client.get_entity(full_id)
+            entity = await entity_cache.get_entity(client, full_id)
         else:
             # Если это username, используем как есть
-            entity = await client.get_entity(group_id)
+            entity = await entity_cache.get_entity(client, group_id)
         
         if not isinstance(entity, (Channel, Chat)):
             logger.error(f"Сущность {group_id} не является группой или каналом")
@@ -207,6 +268,7 @@ async def is_admin_in_group(client: TelegramClient, group_id: str, user_id: int)
         logger.error(f"Ошибка при проверке прав администратора: {e}")
         return False
 
+@coalesce(lambda client, user_id: user_id)
 async def get_user_info(client: TelegramClient, user_id: int) -> Optional[Dict[str, Any]]:
     """
     Получает информацию о пользователе
@@ -219,7 +281,7 @@ async def get_user_info(client: TelegramClient, user_id: int) -> Optional[Dict[s
         Dict с информацией о пользователе или None в случае ошибки
     """
     try:
-        user = await client.get_entity(user_id)
+        user = await entity_cache.get_entity(client, user_id)
         
         if not isinstance(user, User):
             return None